@@ -1,17 +1,67 @@
 # DeliveryAgent class implementing BFS, UCS, A* pathfinding algorithms and dynamic replanning
 from collections import deque
-from utils import MyPriorityQueue, calculate_manhattan_heuristic
+from utils import MyPriorityQueue, PRIORITY_QUEUES, SearchBuffers, RouteCache, calculate_manhattan_heuristic, calculate_terrain_scaled_heuristic
+from jump_points import get_jump_tables, OPPOSITE, UP, DOWN, RIGHT
+from incremental import IncrementalPlanner
+from landmarks import get_landmark_heuristic
+from hierarchical import get_hierarchy, DEFAULT_CLUSTER_SIZE
+from distance_field import get_distance_field
+from multi_stop import order_stops, route_cost
+from instrumentation import SearchInstrumentation, SearchProbe
+from environment import OBSTACLE_COST
 import time
 import random
 
+WAIT_COST = 1
+# Most recent successful searches kept in path_history
+PATH_HISTORY_LIMIT = 1000
+# Debug mode prints search progress every this many frontier pops
+DEBUG_LOG_EVERY = 10
+# Searches over the map at t=0 whose results depend only on (start, goal, options)
+CACHEABLE_ALGORITHMS = ('bfs', 'ucs', 'a_star', 'bidirectional', 'jps', 'hpa_star')
+
 class DeliveryAgent:
-    def __init__(self, environment):
+    def __init__(self, environment, history_limit=PATH_HISTORY_LIMIT):
         self.env = environment
         self.start_pos = environment.start_pos
         self.goal_pos = environment.goal_pos
         self.debug_mode = False
-        self.path_history = []
+        self.path_history = deque(maxlen=history_limit)
         self.performance_stats = {'total_searches': 0, 'successful_searches': 0}
+        self.search_buffers = None
+        self.route_cache = None
+        self.instrumentation = None
+        self.active_probe = None
+
+    def _instrumented(self, label, search, *args):
+        # Reruns search with a SearchProbe attached to its frontier and neighbor
+        # lookups. Searches only come here when instrumentation or debug mode is on,
+        # so the plain hot loops carry no per-expansion checks.
+        log_every = DEBUG_LOG_EVERY if self.debug_mode else 0
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            probe = instrumentation.begin(label, log_every)
+        else:
+            probe = SearchProbe(label, log_every=log_every)
+        self.active_probe = probe
+        try:
+            result = search(*args)
+        finally:
+            self.active_probe = None
+        if instrumentation is not None:
+            instrumentation.finish(probe, result)
+        return result
+
+    def _frontier(self, queue='heap'):
+        frontier = PRIORITY_QUEUES[queue]()
+        return frontier if self.active_probe is None else self.active_probe.frontier(frontier)
+
+    def _fifo(self, items):
+        return deque(items) if self.active_probe is None else self.active_probe.fifo(items)
+
+    def _neighbor_source(self):
+        get_neighbors = self.env.get_neighbors
+        return get_neighbors if self.active_probe is None else self.active_probe.neighbors(get_neighbors)
 
     def _build_path_backwards(self, parent_map, current_node):
         path_trace = []
@@ -21,16 +71,380 @@ class DeliveryAgent:
         path_trace.reverse()
         return path_trace
 
+    def _build_cell_path_backwards(self, parent_cells, current_cell):
+        # Walks an id-indexed parent buffer and converts to (row, col) only here
+        width = self.env.width
+        path_trace = []
+        while current_cell >= 0:
+            path_trace.append(divmod(current_cell, width))
+            current_cell = parent_cells[current_cell]
+        path_trace.reverse()
+        return path_trace
+
+    def _cell_heuristic(self, heuristic, goal_cell):
+        env = self.env
+        width = env.width
+        goal_row, goal_col = divmod(goal_cell, width)
+        if heuristic == 'manhattan':
+            return lambda cell: abs(cell // width - goal_row) + abs(cell % width - goal_col)
+        if heuristic == 'terrain':
+            min_step_cost = min(env.map_metadata['terrain_types'], default=1)
+            goal_cost = env.get_cost((goal_row, goal_col))
+            return lambda cell: calculate_terrain_scaled_heuristic(
+                divmod(cell, width), (goal_row, goal_col), min_step_cost, goal_cost)
+        if heuristic == 'alt':
+            return get_landmark_heuristic(env).for_goal(goal_cell)
+        raise ValueError(f"Unknown heuristic '{heuristic}'")
+
+    def _cell_estimate(self, heuristic, goal_cell, weight=1):
+        # None selects the inline Manhattan fast path
+        if heuristic == 'manhattan' and weight == 1:
+            return None
+        base_estimate = self._cell_heuristic(heuristic, goal_cell)
+        if weight == 1:
+            return base_estimate
+        return lambda cell: weight * base_estimate(cell)
+
+    def _position_estimate(self, heuristic, weight=1):
+        goal_pos = self.goal_pos
+        if heuristic == 'manhattan':
+            if weight == 1:
+                return lambda position: calculate_manhattan_heuristic(position, goal_pos)
+            return lambda position: weight * calculate_manhattan_heuristic(position, goal_pos)
+        cell_estimate = self._cell_estimate(heuristic, self.env.cell_id(goal_pos), weight)
+        cell_id = self.env.cell_id
+        return lambda position: cell_estimate(cell_id(position))
+
+    def _search_buffers(self):
+        cell_count = self.env.width * self.env.height
+        if self.search_buffers is None or self.search_buffers.cell_count != cell_count:
+            self.search_buffers = SearchBuffers(cell_count)
+        self.search_buffers.reset()
+        return self.search_buffers
+
+    def _bfs_tree(self, start_cell, goal_cells):
+        # Breadth-first tree on the compact grid that stops once every goal is reached;
+        # returns {goal_cell: expansions when reached} and leaves parents in the buffers
+        neighbor_table = self.env.neighbor_table
+        buffers = self._search_buffers()
+        generation = buffers.generation
+        parent_cells, seen = buffers.parent, buffers.seen
+        seen[start_cell] = generation
+        parent_cells[start_cell] = -1
+        remaining = set(goal_cells)
+        reached = {}
+        search_queue = self._fifo([start_cell])
+        expansion_count = 0
+        
+        while search_queue:
+            current_cell = search_queue.popleft()
+            expansion_count += 1
+            
+            if current_cell in remaining:
+                reached[current_cell] = expansion_count
+                remaining.discard(current_cell)
+                if not remaining:
+                    break
+            
+            base = 4 * current_cell
+            for neighbor_cell in neighbor_table[base:base + 4]:
+                if neighbor_cell >= 0 and seen[neighbor_cell] != generation:
+                    seen[neighbor_cell] = generation
+                    parent_cells[neighbor_cell] = current_cell
+                    search_queue.append(neighbor_cell)
+        
+        return reached, expansion_count
+
+    def _best_first_tree(self, start_cell, goal_cells, use_heuristic=False, closed_set=False, estimate=None,
+                         queue='heap'):
+        # UCS/A* on the compact grid that stops once every goal is popped; the
+        # heuristic only applies with a single goal and is inline Manhattan distance
+        # unless an estimate(cell) callable is given. Returns
+        # {goal_cell: (cost, expansions, pops)}, total expansions and total pops.
+        env = self.env
+        width = env.width
+        neighbor_table = env.neighbor_table
+        cell_costs = env.cell_costs
+        buffers = self._search_buffers()
+        generation = buffers.generation
+        parent_cells, cost_tracker = buffers.parent, buffers.cost
+        seen, closed = buffers.seen, buffers.closed
+        seen[start_cell] = generation
+        cost_tracker[start_cell] = 0
+        parent_cells[start_cell] = -1
+        if use_heuristic:
+            goal_row, goal_col = divmod(next(iter(goal_cells)), width)
+        remaining = set(goal_cells)
+        reached = {}
+        frontier = self._frontier(queue)
+        frontier.enqueue(start_cell, 0)
+        pop_count = 0
+        expansion_count = 0
+        
+        while not frontier.is_empty():
+            current_cell = frontier.dequeue()
+            pop_count += 1
+            if closed_set:
+                if closed[current_cell] == generation:
+                    continue
+                closed[current_cell] = generation
+            expansion_count += 1
+            
+            if current_cell in remaining:
+                reached[current_cell] = (cost_tracker[current_cell], expansion_count, pop_count)
+                remaining.discard(current_cell)
+                if not remaining:
+                    break
+            
+            current_cost = cost_tracker[current_cell]
+            base = 4 * current_cell
+            for neighbor_cell in neighbor_table[base:base + 4]:
+                if neighbor_cell < 0 or (closed_set and closed[neighbor_cell] == generation):
+                    continue
+                new_total_cost = current_cost + cell_costs[neighbor_cell]
+                if seen[neighbor_cell] != generation or new_total_cost < cost_tracker[neighbor_cell]:
+                    seen[neighbor_cell] = generation
+                    cost_tracker[neighbor_cell] = new_total_cost
+                    parent_cells[neighbor_cell] = current_cell
+                    priority = new_total_cost
+                    if estimate is not None:
+                        priority += estimate(neighbor_cell)
+                    elif use_heuristic:
+                        row, col = divmod(neighbor_cell, width)
+                        priority += abs(row - goal_row) + abs(col - goal_col)
+                    frontier.enqueue(neighbor_cell, priority)
+        
+        return reached, expansion_count, pop_count
+
+    def _bfs_path_cost(self, path):
+        cell_costs = self.env.cell_costs
+        width = self.env.width
+        return sum(cell_costs[row * width + col] for row, col in path)
+
+    def _endpoints_on_map(self):
+        # Cell ids wrap around rows, so off-map positions must be caught before cell_id()
+        return self.env.is_valid(self.start_pos) and self.env.is_valid(self.goal_pos)
+
+    def _bfs_compact(self, start_timer):
+        goal_cell = self.env.cell_id(self.goal_pos)
+        if self._endpoints_on_map():
+            reached, expansion_count = self._bfs_tree(self.env.cell_id(self.start_pos), (goal_cell,))
+        else:
+            reached, expansion_count = {}, 0
+        
+        if goal_cell in reached:
+            final_path = self._build_cell_path_backwards(self.search_buffers.parent, goal_cell)
+            execution_time = time.perf_counter() - start_timer
+            self.performance_stats['successful_searches'] += 1
+            self.path_history.append(('BFS', final_path, execution_time))
+            return {'path': final_path, 'cost': self._bfs_path_cost(final_path), 'nodes_expanded': expansion_count,
+                    'time': execution_time}
+        
+        execution_time = time.perf_counter() - start_timer
+        return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+
+    def _best_first_compact(self, label, use_heuristic, start_timer, closed_set=False, heuristic='manhattan',
+                            weight=1, queue='heap'):
+        goal_cell = self.env.cell_id(self.goal_pos)
+        if self._endpoints_on_map():
+            estimate = self._cell_estimate(heuristic, goal_cell, weight) if use_heuristic else None
+            reached, expansion_count, pop_count = self._best_first_tree(
+                self.env.cell_id(self.start_pos), (goal_cell,), use_heuristic, closed_set, estimate, queue)
+        else:
+            reached, expansion_count, pop_count = {}, 0, 0
+        
+        if goal_cell in reached:
+            final_path = self._build_cell_path_backwards(self.search_buffers.parent, goal_cell)
+            execution_time = time.perf_counter() - start_timer
+            self.performance_stats['successful_searches'] += 1
+            self.path_history.append((label, final_path, execution_time))
+            result = {'path': final_path, 'cost': reached[goal_cell][0], 'nodes_expanded': expansion_count,
+                      'time': execution_time}
+        else:
+            execution_time = time.perf_counter() - start_timer
+            result = {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+        if closed_set:
+            result.update({'pops': pop_count, 'unique_expansions': expansion_count})
+        return result
+
+    def route_many(self, pairs, algo='a_star'):
+        # Answers (start, goal) pairs against the shared map in input order. Queries
+        # are grouped by start so one search tree serves every goal from that start,
+        # and all of them reuse the agent's generation-stamped search buffers.
+        if algo not in ('bfs', 'ucs', 'a_star'):
+            raise ValueError(f"route_many does not support algorithm '{algo}'")
+        label = {'bfs': 'BFS', 'ucs': 'UCS', 'a_star': 'A*'}[algo]
+        
+        results = [None] * len(pairs)
+        cache = self.route_cache
+        version = self.env.version
+        pending = []
+        for index, (start_pos, goal_pos) in enumerate(pairs):
+            start_pos, goal_pos = tuple(start_pos), tuple(goal_pos)
+            if cache is not None:
+                cached = cache.get(version, start_pos, goal_pos, (algo,))
+                if cached is not None:
+                    results[index] = self._cached_result(cached, time.perf_counter())
+                    continue
+            pending.append((index, start_pos, goal_pos))
+        
+        routed = self._route_pairs([(start_pos, goal_pos) for _, start_pos, goal_pos in pending], algo)
+        self.performance_stats['total_searches'] += len(pending)
+        for (index, start_pos, goal_pos), result in zip(pending, routed):
+            if result['path']:
+                self.performance_stats['successful_searches'] += 1
+                self.path_history.append((label, result['path'], result['time']))
+            results[index] = result
+            if cache is not None:
+                cache.put(version, start_pos, goal_pos, (algo,), result)
+        
+        return results
+
+    def _route_pairs(self, pairs, algo):
+        # Search core shared by route_many and plan_deliveries; leaves the stats,
+        # path history and route cache to the caller. The tree searches read the
+        # compact neighbor table, which is built on demand without switching the
+        # map's own compact mode.
+        env = self.env
+        if env.neighbor_table is None:
+            compact = env.compact
+            env.build_compact_grid()
+            env.compact = compact
+        
+        results = [None] * len(pairs)
+        queries_by_start = {}
+        for index, (start_pos, goal_pos) in enumerate(pairs):
+            queries_by_start.setdefault(tuple(start_pos), []).append((index, tuple(goal_pos)))
+        
+        for start_pos, queries in queries_by_start.items():
+            start_timer = time.perf_counter()
+            goal_cells = {env.cell_id(goal_pos) for _, goal_pos in queries if env.is_valid(goal_pos)}
+            tree_reached = {}
+            if not env.is_valid(start_pos) or not goal_cells:
+                reached, expansion_count = {}, 0
+            elif algo == 'bfs':
+                reached, expansion_count = self._bfs_tree(env.cell_id(start_pos), goal_cells)
+            else:
+                use_heuristic = algo == 'a_star' and len(goal_cells) == 1
+                tree_reached, expansion_count, _ = self._best_first_tree(env.cell_id(start_pos), goal_cells,
+                                                                         use_heuristic)
+                reached = {cell: details[1] for cell, details in tree_reached.items()}
+            
+            parent_cells = self.search_buffers.parent if self.search_buffers else None
+            paths = {}
+            for cell in reached:
+                path = self._build_cell_path_backwards(parent_cells, cell)
+                cost = self._bfs_path_cost(path) if algo == 'bfs' else tree_reached[cell][0]
+                paths[cell] = (path, cost)
+            execution_time = time.perf_counter() - start_timer
+            
+            for index, goal_pos in queries:
+                cell = env.cell_id(goal_pos) if env.is_valid(goal_pos) else None
+                if cell in paths:
+                    path, cost = paths[cell]
+                    results[index] = {'path': path, 'cost': cost, 'nodes_expanded': reached[cell],
+                                      'time': execution_time}
+                else:
+                    results[index] = {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count,
+                                      'time': execution_time}
+        
+        return results
+
+    def enable_route_cache(self, capacity=1024):
+        if self.route_cache is not None:
+            self.route_cache.detach()
+        self.route_cache = RouteCache(self.env, capacity)
+
+    def _cached_result(self, cached, start_timer):
+        self.performance_stats['total_searches'] += 1
+        if cached['path']:
+            self.performance_stats['successful_searches'] += 1
+        return dict(cached, time=time.perf_counter() - start_timer, cached=True)
+
+    def find_route(self, algo='a_star', **options):
+        # Runs one of the static-map searches by name for the current start/goal,
+        # answering repeats from the route cache when it is enabled
+        if algo not in CACHEABLE_ALGORITHMS:
+            raise ValueError(f"find_route does not support algorithm '{algo}'")
+        search = self.jump_point_search if algo == 'jps' else getattr(self, algo)
+        cache = self.route_cache
+        if cache is None or not self.start_pos or not self.goal_pos:
+            return search(**options)
+        
+        start_timer = time.perf_counter()
+        algo_key = (algo,) + tuple(sorted(options.items()))
+        version = self.env.version
+        cached = cache.get(version, self.start_pos, self.goal_pos, algo_key)
+        if cached is not None:
+            return self._cached_result(cached, start_timer)
+        result = search(**options)
+        cache.put(version, self.start_pos, self.goal_pos, algo_key, result)
+        return result
+
+    def _best_first_closed(self, label, use_heuristic, start_timer, heuristic='manhattan', weight=1, queue='heap'):
+        # Lazy-deletion search core: stale heap entries for already-closed nodes are
+        # popped and dropped without rescanning neighbors. Manhattan distance is
+        # consistent with step costs >= 1, so the first pop of a node is final.
+        frontier = self._frontier(queue)
+        frontier.enqueue(self.start_pos, 0)
+        parent_mapping = {self.start_pos: None}
+        cost_tracker = {self.start_pos: 0}
+        closed_nodes = set()
+        get_neighbors = self._neighbor_source()
+        goal_pos = self.goal_pos
+        estimate = self._position_estimate(heuristic, weight) if use_heuristic else None
+        pop_count = 0
+        expansion_count = 0
+        
+        while not frontier.is_empty():
+            current_node = frontier.dequeue()
+            pop_count += 1
+            if current_node in closed_nodes:
+                continue
+            closed_nodes.add(current_node)
+            expansion_count += 1
+            
+            if current_node == goal_pos:
+                final_path = self._build_path_backwards(parent_mapping, current_node)
+                execution_time = time.perf_counter() - start_timer
+                self.performance_stats['successful_searches'] += 1
+                self.path_history.append((label, final_path, execution_time))
+                return {'path': final_path, 'cost': cost_tracker[current_node], 'nodes_expanded': expansion_count,
+                        'time': execution_time, 'pops': pop_count, 'unique_expansions': expansion_count}
+            
+            current_cost = cost_tracker[current_node]
+            for neighbor_node, move_cost in get_neighbors(current_node):
+                if neighbor_node in closed_nodes:
+                    continue
+                new_total_cost = current_cost + move_cost
+                if neighbor_node not in cost_tracker or new_total_cost < cost_tracker[neighbor_node]:
+                    cost_tracker[neighbor_node] = new_total_cost
+                    parent_mapping[neighbor_node] = current_node
+                    priority = new_total_cost
+                    if use_heuristic:
+                        priority += estimate(neighbor_node)
+                    frontier.enqueue(neighbor_node, priority)
+        
+        execution_time = time.perf_counter() - start_timer
+        return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time,
+                'pops': pop_count, 'unique_expansions': expansion_count}
+
     def bfs(self):
+        if self.active_probe is None and (self.instrumentation is not None or self.debug_mode):
+            return self._instrumented('bfs', self.bfs)
         self.performance_stats['total_searches'] += 1
-        start_timer = time.time()
+        start_timer = time.perf_counter()
         
         if not self.start_pos or not self.goal_pos:
             return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
         
-        search_queue = deque([self.start_pos])
+        if self.env.compact:
+            return self._bfs_compact(start_timer)
+        
+        search_queue = self._fifo([self.start_pos])
         parent_tracker = {self.start_pos: None}
         explored_nodes = {self.start_pos}
+        get_neighbors = self._neighbor_source()
         expansion_count = 0
         
         if self.debug_mode:
@@ -40,37 +454,44 @@ class DeliveryAgent:
             current_node = search_queue.popleft()
             expansion_count += 1
             
-            if self.debug_mode and expansion_count % 10 == 0:
-                print(f"Expanded {expansion_count} nodes, current: {current_node}")
-            
             if current_node == self.goal_pos:
                 final_path = self._build_path_backwards(parent_tracker, current_node)
                 total_path_cost = sum(self.env.get_cost(pos) for pos in final_path)
-                execution_time = time.time() - start_timer
+                execution_time = time.perf_counter() - start_timer
                 self.performance_stats['successful_searches'] += 1
                 self.path_history.append(('BFS', final_path, execution_time))
                 return {'path': final_path, 'cost': total_path_cost, 'nodes_expanded': expansion_count, 'time': execution_time}
             
-            for neighbor_node, _ in self.env.get_neighbors(current_node):
+            for neighbor_node, _ in get_neighbors(current_node):
                 if neighbor_node not in explored_nodes:
                     explored_nodes.add(neighbor_node)
                     parent_tracker[neighbor_node] = current_node
                     search_queue.append(neighbor_node)
         
-        execution_time = time.time() - start_timer
+        execution_time = time.perf_counter() - start_timer
         return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
 
-    def ucs(self):
+    def ucs(self, closed_set=False, queue='heap'):
+        # queue='bucket' swaps the heap for BucketPriorityQueue; path costs are integers
+        if self.active_probe is None and (self.instrumentation is not None or self.debug_mode):
+            return self._instrumented('ucs', self.ucs, closed_set, queue)
         self.performance_stats['total_searches'] += 1
-        start_timer = time.time()
+        start_timer = time.perf_counter()
         
         if not self.start_pos or not self.goal_pos:
             return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
         
-        priority_frontier = MyPriorityQueue()
+        if self.env.compact:
+            return self._best_first_compact('UCS', False, start_timer, closed_set, queue=queue)
+        
+        if closed_set:
+            return self._best_first_closed('UCS', False, start_timer, queue=queue)
+        
+        priority_frontier = self._frontier(queue)
         priority_frontier.enqueue(self.start_pos, 0)
         parent_mapping = {self.start_pos: None}
         cost_tracker = {self.start_pos: 0}
+        get_neighbors = self._neighbor_source()
         expansion_count = 0
         
         while not priority_frontier.is_empty():
@@ -80,12 +501,12 @@ class DeliveryAgent:
             if current_node == self.goal_pos:
                 final_path = self._build_path_backwards(parent_mapping, current_node)
                 total_cost = cost_tracker[current_node]
-                execution_time = time.time() - start_timer
+                execution_time = time.perf_counter() - start_timer
                 self.performance_stats['successful_searches'] += 1
                 self.path_history.append(('UCS', final_path, execution_time))
                 return {'path': final_path, 'cost': total_cost, 'nodes_expanded': expansion_count, 'time': execution_time}
             
-            for neighbor_node, move_cost in self.env.get_neighbors(current_node):
+            for neighbor_node, move_cost in get_neighbors(current_node):
                 new_total_cost = cost_tracker[current_node] + move_cost
                 
                 if neighbor_node not in cost_tracker or new_total_cost < cost_tracker[neighbor_node]:
@@ -93,20 +514,35 @@ class DeliveryAgent:
                     parent_mapping[neighbor_node] = current_node
                     priority_frontier.enqueue(neighbor_node, new_total_cost)
         
-        execution_time = time.time() - start_timer
+        execution_time = time.perf_counter() - start_timer
         return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
 
-    def a_star(self):
+    def a_star(self, closed_set=False, heuristic='manhattan', weight=1, queue='heap'):
+        # weight > 1 gives weighted A*: f = g + weight * h, cost within weight x optimal.
+        # queue='bucket' needs integer f-scores, so it only combines with weight 1.
+        if queue == 'bucket' and weight != 1:
+            raise ValueError("The bucket queue needs integer f-scores; use weight 1")
+        if self.active_probe is None and (self.instrumentation is not None or self.debug_mode):
+            return self._instrumented('a_star', self.a_star, closed_set, heuristic, weight, queue)
         self.performance_stats['total_searches'] += 1
-        start_timer = time.time()
+        start_timer = time.perf_counter()
         
         if not self.start_pos or not self.goal_pos:
             return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
         
-        search_frontier = MyPriorityQueue()
+        if self.env.compact:
+            return self._best_first_compact('A*', True, start_timer, closed_set, heuristic, weight, queue)
+        
+        if closed_set:
+            return self._best_first_closed('A*', True, start_timer, heuristic, weight, queue)
+        
+        estimate = self._position_estimate(heuristic, weight)
+        
+        search_frontier = self._frontier(queue)
         search_frontier.enqueue(self.start_pos, 0)
         parent_mapping = {self.start_pos: None}
         cost_tracker = {self.start_pos: 0}
+        get_neighbors = self._neighbor_source()
         expansion_count = 0
         
         while not search_frontier.is_empty():
@@ -116,31 +552,534 @@ class DeliveryAgent:
             if current_node == self.goal_pos:
                 final_path = self._build_path_backwards(parent_mapping, current_node)
                 total_cost = cost_tracker[current_node]
-                execution_time = time.time() - start_timer
+                execution_time = time.perf_counter() - start_timer
                 self.performance_stats['successful_searches'] += 1
                 self.path_history.append(('A*', final_path, execution_time))
                 return {'path': final_path, 'cost': total_cost, 'nodes_expanded': expansion_count, 'time': execution_time}
             
-            for neighbor_node, move_cost in self.env.get_neighbors(current_node):
+            for neighbor_node, move_cost in get_neighbors(current_node):
                 new_total_cost = cost_tracker[current_node] + move_cost
                 
                 if neighbor_node not in cost_tracker or new_total_cost < cost_tracker[neighbor_node]:
                     cost_tracker[neighbor_node] = new_total_cost
-                    heuristic_value = calculate_manhattan_heuristic(neighbor_node, self.goal_pos)
+                    heuristic_value = estimate(neighbor_node)
                     f_score = new_total_cost + heuristic_value
                     parent_mapping[neighbor_node] = current_node
                     search_frontier.enqueue(neighbor_node, f_score)
         
-        execution_time = time.time() - start_timer
+        execution_time = time.perf_counter() - start_timer
+        return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+
+    def _search_graph(self):
+        # Neighbor, step-cost and heuristic callables over whichever node type the
+        # environment uses: (row, col) tuples, or integer cell ids in compact mode
+        env = self.env
+        if not env.compact:
+            return (self.start_pos, self.goal_pos, env.get_neighbors,
+                    calculate_manhattan_heuristic, self._build_path_backwards)
+        width = env.width
+        neighbor_table = env.neighbor_table
+        cell_costs = env.cell_costs
+        
+        def get_neighbors(cell):
+            base = 4 * cell
+            return [(neighbor, cell_costs[neighbor]) for neighbor in neighbor_table[base:base + 4] if neighbor >= 0]
+        
+        def heuristic(cell_a, cell_b):
+            row_a, col_a = divmod(cell_a, width)
+            row_b, col_b = divmod(cell_b, width)
+            return abs(row_a - row_b) + abs(col_a - col_b)
+        
+        def build_path(parent_map, cell):
+            return [divmod(node, width) for node in self._build_path_backwards(parent_map, cell)]
+        
+        return env.cell_id(self.start_pos), env.cell_id(self.goal_pos), get_neighbors, heuristic, build_path
+
+    def bidirectional(self, use_heuristic=True):
+        # Bidirectional A* with the average potential p(v) = (h_goal(v) - h_start(v)) / 2,
+        # or plain bidirectional Dijkstra when use_heuristic is False. Keys are doubled
+        # so they stay integral. Moving u -> v costs the terrain cost of v, so the
+        # backward search pays the cost of the cell it is leaving.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos or not self.goal_pos:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        # The backward search starts at the goal, so a blocked goal would be treated as open
+        if not self._endpoints_on_map() or self.env.is_obstacle(self.goal_pos):
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0,
+                    'time': time.perf_counter() - start_timer}
+        
+        start_node, goal_node, get_neighbors, heuristic, build_path = self._search_graph()
+        
+        def potential(node):
+            if not use_heuristic:
+                return 0
+            return heuristic(node, goal_node) - heuristic(node, start_node)
+        
+        frontiers = (MyPriorityQueue(), MyPriorityQueue())
+        cost_trackers = ({start_node: 0}, {goal_node: 0})
+        parent_maps = ({start_node: None}, {goal_node: None})
+        closed_sets = (set(), set())
+        signs = (1, -1)
+        frontiers[0].enqueue(start_node, potential(start_node))
+        frontiers[1].enqueue(goal_node, -potential(goal_node))
+        
+        best_cost = float('inf')
+        meeting_node = start_node if start_node == goal_node else None
+        if meeting_node is not None:
+            best_cost = 0
+        expansion_count = 0
+        
+        while not frontiers[0].is_empty() and not frontiers[1].is_empty():
+            if frontiers[0].peek_priority() + frontiers[1].peek_priority() >= 2 * best_cost:
+                break
+            
+            side = 0 if len(frontiers[0].heap_data) <= len(frontiers[1].heap_data) else 1
+            frontier = frontiers[side]
+            cost_tracker, other_costs = cost_trackers[side], cost_trackers[1 - side]
+            closed_nodes = closed_sets[side]
+            sign = signs[side]
+            
+            current_node = frontier.dequeue()
+            if current_node in closed_nodes:
+                continue
+            closed_nodes.add(current_node)
+            expansion_count += 1
+            
+            current_cost = cost_tracker[current_node]
+            leave_cost = None
+            for neighbor_node, move_cost in get_neighbors(current_node):
+                if side == 1:
+                    # Backward edge neighbor -> current costs the terrain of current
+                    if leave_cost is None:
+                        leave_cost = self._node_cost(current_node)
+                    move_cost = leave_cost
+                new_total_cost = current_cost + move_cost
+                if neighbor_node not in cost_tracker or new_total_cost < cost_tracker[neighbor_node]:
+                    cost_tracker[neighbor_node] = new_total_cost
+                    parent_maps[side][neighbor_node] = current_node
+                    frontier.enqueue(neighbor_node, 2 * new_total_cost + sign * potential(neighbor_node))
+                    if neighbor_node in other_costs and new_total_cost + other_costs[neighbor_node] < best_cost:
+                        best_cost = new_total_cost + other_costs[neighbor_node]
+                        meeting_node = neighbor_node
+        
+        execution_time = time.perf_counter() - start_timer
+        if meeting_node is None:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+        
+        forward_path = build_path(parent_maps[0], meeting_node)
+        backward_path = build_path(parent_maps[1], meeting_node)
+        final_path = forward_path + backward_path[::-1][1:]
+        execution_time = time.perf_counter() - start_timer
+        self.performance_stats['successful_searches'] += 1
+        self.path_history.append(('BIDIRECTIONAL', final_path, execution_time))
+        return {'path': final_path, 'cost': best_cost, 'nodes_expanded': expansion_count, 'time': execution_time}
+
+    def jump_point_search(self):
+        # A* over jump points using the JPS+ tables cached on the environment. Jumps
+        # only cross cost-1 cells; other terrain is expanded one cell at a time.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos or not self.goal_pos or not self._endpoints_on_map():
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        
+        tables = get_jump_tables(self.env)
+        costs, uniform, jumps = tables['costs'], tables['uniform'], tables['jumps']
+        width = self.env.width
+        steps = (-width, width, -1, 1)
+        start_cell = self.env.cell_id(self.start_pos)
+        goal_cell = self.env.cell_id(self.goal_pos)
+        goal_row, goal_col = self.goal_pos
+        
+        frontier = MyPriorityQueue()
+        frontier.enqueue(start_cell, 0)
+        parent_mapping = {start_cell: None}
+        cost_tracker = {start_cell: 0}
+        arrival_direction = {start_cell: None}
+        closed_cells = set()
+        expansion_count = 0
+        
+        while not frontier.is_empty():
+            current_cell = frontier.dequeue()
+            if current_cell in closed_cells:
+                continue
+            closed_cells.add(current_cell)
+            expansion_count += 1
+            
+            if current_cell == goal_cell:
+                jump_path = self._build_path_backwards(parent_mapping, current_cell)
+                final_path = [divmod(jump_path[0], width)]
+                for from_cell, to_cell in zip(jump_path, jump_path[1:]):
+                    row_a, col_a = divmod(from_cell, width)
+                    row_b, col_b = divmod(to_cell, width)
+                    step_row = (row_b > row_a) - (row_b < row_a)
+                    step_col = (col_b > col_a) - (col_b < col_a)
+                    while (row_a, col_a) != (row_b, col_b):
+                        row_a, col_a = row_a + step_row, col_a + step_col
+                        final_path.append((row_a, col_a))
+                execution_time = time.perf_counter() - start_timer
+                self.performance_stats['successful_searches'] += 1
+                self.path_history.append(('JPS', final_path, execution_time))
+                return {'path': final_path, 'cost': cost_tracker[current_cell], 'nodes_expanded': expansion_count,
+                        'time': execution_time}
+            
+            came_from = arrival_direction[current_cell]
+            current_cost = cost_tracker[current_cell]
+            row, col = divmod(current_cell, width)
+            for direction in range(4):
+                if came_from is not None and uniform[current_cell] and direction == OPPOSITE[came_from]:
+                    continue
+                jump = jumps[direction][current_cell]
+                reach = jump if jump > 0 else -jump
+                if reach == 0:
+                    continue
+                distance = jump if jump > 0 else 0
+                # The tables are goal independent, so stop on the goal itself, or on its
+                # row when moving vertically so the horizontal scan there can find it
+                if direction == UP or direction == DOWN:
+                    goal_distance = (goal_row - row) * (1 if direction == DOWN else -1)
+                elif row == goal_row:
+                    goal_distance = (goal_col - col) * (1 if direction == RIGHT else -1)
+                else:
+                    goal_distance = 0
+                if 0 < goal_distance <= reach and (distance == 0 or goal_distance < distance):
+                    distance = goal_distance
+                if distance == 0:
+                    continue
+                
+                next_cell = current_cell + distance * steps[direction]
+                if next_cell in closed_cells:
+                    continue
+                new_total_cost = current_cost + distance - 1 + costs[next_cell]
+                if next_cell not in cost_tracker or new_total_cost < cost_tracker[next_cell]:
+                    cost_tracker[next_cell] = new_total_cost
+                    parent_mapping[next_cell] = current_cell
+                    arrival_direction[next_cell] = direction
+                    next_row, next_col = divmod(next_cell, width)
+                    f_score = new_total_cost + abs(next_row - goal_row) + abs(next_col - goal_col)
+                    frontier.enqueue(next_cell, f_score)
+        
+        execution_time = time.perf_counter() - start_timer
+        return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+
+    def hpa_star(self, cluster_size=DEFAULT_CLUSTER_SIZE):
+        # Hierarchical A* over the map's cached cluster/entrance graph, refined only
+        # inside the clusters the abstract path uses. Paths are near-optimal: they
+        # are restricted to cross cluster borders at entrance cells.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos or not self.goal_pos or not self._endpoints_on_map():
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        
+        env = self.env
+        hierarchy = get_hierarchy(env, cluster_size)
+        cell_path, total_cost, expansion_count = hierarchy.find_path(env.cell_id(self.start_pos),
+                                                                     env.cell_id(self.goal_pos))
+        execution_time = time.perf_counter() - start_timer
+        if cell_path is None:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+        
+        final_path = [env.cell_position(cell) for cell in cell_path]
+        self.performance_stats['successful_searches'] += 1
+        self.path_history.append(('HPA*', final_path, execution_time))
+        return {'path': final_path, 'cost': total_cost, 'nodes_expanded': expansion_count, 'time': execution_time}
+
+    def distance_field_route(self, mode='auto'):
+        # Walks down the goal's cost-to-go field. The field is built once per goal
+        # and map version, so later queries towards the same goal do no search.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos or not self.goal_pos or not self._endpoints_on_map():
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        
+        cached_field = self.env.distance_fields.get((frozenset([self.goal_pos]), mode))
+        field = get_distance_field(self.env, [self.goal_pos], mode)
+        expansion_count = 0 if field is cached_field else field.expansions
+        final_path = field.descend(self.start_pos)
+        execution_time = time.perf_counter() - start_timer
+        if final_path is None:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
+        
+        self.performance_stats['successful_searches'] += 1
+        self.path_history.append(('Distance Field', final_path, execution_time))
+        return {'path': final_path, 'cost': field.cost_to_go(self.start_pos), 'nodes_expanded': expansion_count,
+                'time': execution_time}
+
+    def plan_deliveries(self, stops=None, time_budget=0.5, return_to_start=False):
+        # Visits every stop (default: the map's D markers) from start_pos. Leg costs
+        # come from one one-to-many search per stop via _route_pairs, the order from
+        # nearest neighbor + 2-opt/Or-opt within time_budget, and the chosen legs'
+        # paths are stitched into one route.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        
+        env = self.env
+        stops = list(dict.fromkeys(tuple(stop) for stop in (env.delivery_positions if stops is None else stops)))
+        places = [tuple(self.start_pos)] + [stop for stop in stops if stop != tuple(self.start_pos)]
+        # Only legs i -> j with i < j are searched: the reverse leg is the same path
+        # backwards and costs c(i) - c(j) more, since each step pays for the cell entered
+        legs = self._route_pairs([(places[from_index], places[to_index]) for from_index in range(len(places))
+                                 for to_index in range(from_index + 1, len(places))], algo='ucs')
+        
+        leg_costs = [[0] * len(places) for _ in places]
+        leg_paths = {}
+        expansions_by_start = {}
+        leg_results = iter(legs)
+        for from_index in range(len(places)):
+            for to_index in range(from_index + 1, len(places)):
+                leg = next(leg_results)
+                leg_costs[from_index][to_index] = leg['cost']
+                leg_paths[(from_index, to_index)] = leg['path']
+                if leg['path']:
+                    leg_costs[to_index][from_index] = (leg['cost'] + env.get_cost(places[from_index]) -
+                                                       env.get_cost(places[to_index]))
+                    leg_paths[(to_index, from_index)] = leg['path'][::-1]
+                else:
+                    leg_costs[to_index][from_index] = float('inf')
+                expansions_by_start[from_index] = max(expansions_by_start.get(from_index, 0),
+                                                      leg['nodes_expanded'])
+        expansion_count = sum(expansions_by_start.values())
+        
+        # Every leg out of the depot that fails marks a stop nobody can reach; on a
+        # 4-connected grid the remaining stops all reach each other
+        reachable = [index for index in range(1, len(places)) if leg_costs[0][index] != float('inf')]
+        unreachable_stops = [places[index] for index in range(1, len(places)) if index not in reachable]
+        order = order_stops(leg_costs, reachable, time_budget, return_to_start)
+        if return_to_start and len(order) > 1:
+            order.append(0)
+        
+        final_path = [places[0]]
+        for from_index, to_index in zip(order, order[1:]):
+            final_path.extend(leg_paths[(from_index, to_index)][1:])
+        total_cost = route_cost(order, leg_costs)
+        execution_time = time.perf_counter() - start_timer
+        
+        self.performance_stats['successful_searches'] += 1
+        self.path_history.append(('Multi-Stop', final_path, execution_time))
+        return {'path': final_path, 'cost': total_cost, 'nodes_expanded': expansion_count, 'time': execution_time,
+                'stop_order': [places[index] for index in order[1:]], 'unreachable_stops': unreachable_stops}
+
+    def space_time_a_star(self, max_time=None, reservations=None, start_time=0, park_at_goal=False, estimate=None,
+                          max_expansions=None):
+        # A* over (cell, t) states with a wait action, honouring dynamic_obstacles at
+        # the time step the agent would occupy each cell and an optional ReservationTable.
+        # Past the last scheduled obstacle/reservation the map is static, so times are
+        # clamped to that horizon and states collapse back to one per cell. With
+        # park_at_goal the goal only counts once no reservation needs it afterwards.
+        # estimate(position) may replace Manhattan distance, e.g. a static cost-to-go
+        # field; it must ignore dynamic obstacles to stay admissible. max_expansions
+        # gives up (no path) once that many states were expanded.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos or not self.goal_pos:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        
+        env = self.env
+        horizon = env.last_obstacle_time() + 1
+        if reservations is not None:
+            horizon = max(horizon, reservations.last_time + 1)
+        horizon = max(horizon, start_time)
+        if max_time is None:
+            max_time = horizon + env.width * env.height
+        goal_pos = self.goal_pos
+        if estimate is None:
+            estimate = lambda position: calculate_manhattan_heuristic(position, goal_pos)
+        if estimate(self.start_pos) == float('inf'):
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': time.perf_counter() - start_timer}
+        if park_at_goal and reservations is not None and goal_pos in reservations.parked_from:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': time.perf_counter() - start_timer}
+        
+        def is_free(position, from_pos, time_step):
+            if env.is_obstacle(position, time_step):
+                return False
+            if reservations is not None:
+                if reservations.is_reserved(position, time_step):
+                    return False
+                if reservations.is_edge_reserved(from_pos, position, time_step - 1):
+                    return False
+            return True
+        
+        start_state = (self.start_pos, start_time)
+        frontier = MyPriorityQueue()
+        frontier.enqueue(start_state, estimate(self.start_pos))
+        parent_mapping = {start_state: None}
+        cost_tracker = {start_state: 0}
+        closed_states = set()
+        expansion_count = 0
+        
+        while not frontier.is_empty():
+            current_state = frontier.dequeue()
+            current_pos, current_time = current_state
+            state_key = (current_pos, min(current_time, horizon))
+            if state_key in closed_states:
+                continue
+            closed_states.add(state_key)
+            expansion_count += 1
+            if max_expansions is not None and expansion_count > max_expansions:
+                break
+            
+            if current_pos == goal_pos and (not park_at_goal or reservations is None or
+                                            reservations.can_park(goal_pos, current_time)):
+                final_path = [state[0] for state in self._build_path_backwards(parent_mapping, current_state)]
+                execution_time = time.perf_counter() - start_timer
+                self.performance_stats['successful_searches'] += 1
+                self.path_history.append(('SPACE-TIME A*', final_path, execution_time))
+                return {'path': final_path, 'cost': cost_tracker[state_key], 'nodes_expanded': expansion_count,
+                        'time': execution_time, 'arrival_time': current_time}
+            
+            next_time = current_time + 1
+            if next_time > max_time:
+                continue
+            current_cost = cost_tracker[state_key]
+            moves = [(current_pos, WAIT_COST)]
+            row, col = current_pos
+            for next_pos in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                if env.is_valid(next_pos):
+                    moves.append((next_pos, env.get_cost(next_pos)))
+            
+            for next_pos, move_cost in moves:
+                if not is_free(next_pos, current_pos, next_time):
+                    continue
+                next_key = (next_pos, min(next_time, horizon))
+                if next_key in closed_states:
+                    continue
+                new_total_cost = current_cost + move_cost
+                if next_key not in cost_tracker or new_total_cost < cost_tracker[next_key]:
+                    cost_tracker[next_key] = new_total_cost
+                    parent_mapping[(next_pos, next_time)] = current_state
+                    f_score = new_total_cost + estimate(next_pos)
+                    frontier.enqueue((next_pos, next_time), f_score)
+        
+        execution_time = time.perf_counter() - start_timer
         return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time}
 
-    def dynamic_replanning_demo(self):
+    def ara_star(self, initial_weight=3.0, weight_step=0.5, time_budget=0.5, heuristic='terrain'):
+        # Anytime Repairing A*: publishes a weighted-A* path quickly, then lowers the
+        # weight and repairs the same search (reusing g-values, re-opening only the
+        # inconsistent states) until the weight reaches 1 or the time budget runs out.
+        # The first pass always runs to completion, so a reachable goal always gets a
+        # path. 'suboptimality_bound' is the proven bound for the returned path.
+        self.performance_stats['total_searches'] += 1
+        start_timer = time.perf_counter()
+        
+        if not self.start_pos or not self.goal_pos or not self._endpoints_on_map():
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': 0, 'time': 0}
+        
+        start_node, goal_node, get_neighbors, _, build_path = self._search_graph()
+        if self.env.compact:
+            estimate = self._cell_heuristic(heuristic, goal_node)
+        else:
+            estimate = self._position_estimate(heuristic)
+        deadline = start_timer + time_budget
+        
+        cost_tracker = {start_node: 0}
+        parent_mapping = {start_node: None}
+        open_keys = {}
+        frontier = MyPriorityQueue()
+        closed_nodes = set()
+        inconsistent_nodes = set()
+        weight = max(1.0, initial_weight)
+        solutions = []
+        
+        def open_node(node):
+            key = cost_tracker[node] + weight * estimate(node)
+            open_keys[node] = key
+            frontier.enqueue(node, key)
+        
+        def improve_path():
+            expansions = 0
+            while not frontier.is_empty():
+                key = frontier.peek_priority()
+                node = frontier.peek()
+                if open_keys.get(node) != key:
+                    frontier.dequeue()
+                    continue
+                if key >= cost_tracker.get(goal_node, float('inf')):
+                    return expansions, True
+                if solutions and time.perf_counter() > deadline:
+                    return expansions, False
+                frontier.dequeue()
+                del open_keys[node]
+                closed_nodes.add(node)
+                expansions += 1
+                node_cost = cost_tracker[node]
+                for neighbor_node, move_cost in get_neighbors(node):
+                    new_total_cost = node_cost + move_cost
+                    if neighbor_node not in cost_tracker or new_total_cost < cost_tracker[neighbor_node]:
+                        cost_tracker[neighbor_node] = new_total_cost
+                        parent_mapping[neighbor_node] = node
+                        if neighbor_node in closed_nodes:
+                            inconsistent_nodes.add(neighbor_node)
+                        else:
+                            open_node(neighbor_node)
+            return expansions, True
+        
+        def proven_bound():
+            goal_cost = cost_tracker.get(goal_node, float('inf'))
+            lower = min((cost_tracker[node] + estimate(node) for node in list(open_keys) + list(inconsistent_nodes)),
+                        default=goal_cost)
+            if lower <= 0 or goal_cost == float('inf'):
+                return weight
+            return max(1.0, min(weight, goal_cost / lower))
+        
+        open_node(start_node)
+        expansion_count = 0
+        best_path, best_cost, best_bound = None, float('inf'), float('inf')
+        while True:
+            expansions, completed = improve_path()
+            expansion_count += expansions
+            goal_cost = cost_tracker.get(goal_node, float('inf'))
+            if completed and goal_cost < float('inf'):
+                best_path = build_path(parent_mapping, goal_node)
+                best_cost = goal_cost
+                best_bound = proven_bound()
+                solutions.append({'weight': weight, 'cost': best_cost, 'suboptimality_bound': best_bound,
+                                  'nodes_expanded': expansions, 'time': time.perf_counter() - start_timer})
+            if not completed or weight <= 1.0 or best_bound <= 1.0 or goal_cost == float('inf'):
+                break
+            weight = max(1.0, weight - weight_step)
+            for node in inconsistent_nodes:
+                open_node(node)
+            inconsistent_nodes.clear()
+            for node in list(open_keys):
+                open_node(node)
+            closed_nodes.clear()
+        
+        execution_time = time.perf_counter() - start_timer
+        if best_path is None:
+            return {'path': None, 'cost': float('inf'), 'nodes_expanded': expansion_count, 'time': execution_time,
+                    'solutions': solutions}
+        self.performance_stats['successful_searches'] += 1
+        self.path_history.append(('ARA*', best_path, execution_time))
+        return {'path': best_path, 'cost': best_cost, 'nodes_expanded': expansion_count, 'time': execution_time,
+                'suboptimality_bound': best_bound, 'solutions': solutions}
+
+    def _node_cost(self, node):
+        if self.env.compact:
+            cost = self.env.cell_costs[node]
+            return float('inf') if cost == OBSTACLE_COST else cost
+        return self.env.get_cost(node)
+
+    def dynamic_replanning_demo(self, incremental=False):
         log = []
         log.append("=== Dynamic Replanning Demo ===")
         log.append("")
         
-        log.append("Step 1: Planning initial path using A*")
-        initial_result = self.a_star()
+        planner_name = "D* Lite" if incremental else "A*"
+        log.append(f"Step 1: Planning initial path using {planner_name}")
+        if incremental:
+            planner = IncrementalPlanner(self.env, self.start_pos, self.goal_pos)
+            initial_result = planner.replan()
+        else:
+            initial_result = self.a_star()
         
         if not initial_result['path']:
             log.append("ERROR: No initial path found!")
@@ -179,14 +1118,20 @@ class DeliveryAgent:
         
         log.append("")
         
-        log.append("Step 4: Re-planning path from current position using A*")
-        
-        original_start = self.start_pos
-        self.start_pos = current_position
-        
-        replan_result = self.a_star()
+        log.append(f"Step 4: Re-planning path from current position using {planner_name}")
         
-        self.start_pos = original_start
+        if incremental:
+            # Repairs the previous search at the agent's current time step
+            replan_result = planner.replan(start_pos=current_position, time_step=steps_taken,
+                                           compare_with_scratch=True)
+            planner.detach()
+        else:
+            original_start = self.start_pos
+            self.start_pos = current_position
+            
+            replan_result = self.a_star()
+            
+            self.start_pos = original_start
         
         if not replan_result['path']:
             log.append("ERROR: No replanned path found!")
@@ -195,6 +1140,8 @@ class DeliveryAgent:
         log.append(f"Replanned path found: {replan_result['path']}")
         log.append(f"Replanned path cost: {replan_result['cost']}")
         log.append(f"Nodes expanded for replanning: {replan_result['nodes_expanded']}")
+        if incremental:
+            log.append(f"Nodes expanded by a from-scratch search: {replan_result['scratch_nodes_expanded']}")
         log.append("")
         
         log.append("Step 5: Agent continues with the new path")
@@ -202,6 +1149,15 @@ class DeliveryAgent:
         
         return "\n".join(log)
     
+    def enable_instrumentation(self, trace_every=0, trace_limit=1000):
+        # Per-algorithm counters and latency histograms for bfs/ucs/a_star; every
+        # trace_every-th search also records its first trace_limit expansions
+        self.instrumentation = SearchInstrumentation(trace_every, trace_limit)
+        return self.instrumentation
+    
+    def disable_instrumentation(self):
+        self.instrumentation = None
+    
     def enable_debug_mode(self):
         self.debug_mode = True
         print("Debug mode enabled - will show search progress")
@@ -213,14 +1169,19 @@ class DeliveryAgent:
     def get_performance_summary(self):
         success_rate = (self.performance_stats['successful_searches'] / 
                        self.performance_stats['total_searches'] * 100) if self.performance_stats['total_searches'] > 0 else 0
-        return {
+        summary = {
             'total_searches': self.performance_stats['total_searches'],
             'successful_searches': self.performance_stats['successful_searches'],
             'success_rate': f"{success_rate:.1f}%",
             'path_history_count': len(self.path_history)
         }
+        if self.route_cache is not None:
+            summary['cache_hits'] = self.route_cache.hits
+            summary['cache_misses'] = self.route_cache.misses
+            summary['cache_size'] = len(self.route_cache.entries)
+        return summary
     
     def clear_history(self):
-        self.path_history = []
+        self.path_history.clear()
         self.performance_stats = {'total_searches': 0, 'successful_searches': 0}
         print("Performance history cleared")
\ No newline at end of file
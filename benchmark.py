@@ -0,0 +1,215 @@
+# In-process benchmark suite: synthetic maps, repeated timed trials per algorithm and regression checks against a baseline
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from environment import GridCity
+from agent import DeliveryAgent
+
+# Share of passable cells per terrain cost in each mix
+TERRAIN_MIXES = {
+    'uniform': {1: 1.0},
+    'mixed': {1: 0.6, 2: 0.15, 3: 0.1, 5: 0.1, 9: 0.05},
+    'rough': {1: 0.2, 3: 0.3, 5: 0.3, 9: 0.2},
+}
+
+ALGORITHMS = {
+    'bfs': lambda agent: agent.bfs(),
+    'ucs': lambda agent: agent.ucs(),
+    'a_star': lambda agent: agent.a_star(),
+    'bidirectional': lambda agent: agent.bidirectional(),
+    'jps': lambda agent: agent.jump_point_search(),
+    'hpa_star': lambda agent: agent.hpa_star(),
+    'distance_field': lambda agent: agent.distance_field_route(),
+}
+
+DEFAULT_SIZES = (100, 250, 500, 1000)
+DEFAULT_DENSITIES = (0.1, 0.3)
+DEFAULT_TERRAINS = ('uniform', 'mixed')
+# Time differences below this are treated as noise when comparing with a baseline
+NOISE_FLOOR_NS = 100000
+
+def generate_map(size, obstacle_density, terrain, seed=0):
+    # Square map with S in the top-left and G in the bottom-right corner. A random
+    # monotone staircase between them is carved free of obstacles so G is always
+    # reachable; everything else is drawn independently per cell.
+    rng = random.Random(f"{size}-{obstacle_density}-{terrain}-{seed}")
+    mix = TERRAIN_MIXES[terrain]
+    symbols = ['#'] + ['.' if cost == 1 else str(cost) for cost in mix]
+    weights = [obstacle_density] + [(1 - obstacle_density) * share for share in mix.values()]
+    rows = [rng.choices(symbols, weights, k=size) for _ in range(size)]
+
+    row = col = 0
+    while (row, col) != (size - 1, size - 1):
+        if rows[row][col] == '#':
+            rows[row][col] = '.'
+        if col == size - 1 or (row < size - 1 and rng.random() < 0.5):
+            row += 1
+        else:
+            col += 1
+    rows[0][0] = 'S'
+    rows[size - 1][size - 1] = 'G'
+    return '\n'.join(''.join(symbols_row) for symbols_row in rows) + '\n'
+
+def synthetic_map_path(map_dir, size, obstacle_density, terrain, seed=0):
+    # Maps are written once per parameter set and reused by later runs
+    filepath = os.path.join(map_dir, f"synthetic_{size}_{int(obstacle_density * 100)}_{terrain}_{seed}.txt")
+    if not os.path.exists(filepath):
+        os.makedirs(map_dir, exist_ok=True)
+        with open(filepath, 'w') as map_file:
+            map_file.write(generate_map(size, obstacle_density, terrain, seed))
+    return filepath
+
+def benchmark_algorithm(env, algo, trials=5, warmup=1):
+    # Warmup runs build whatever the algorithm caches on the map (jump tables,
+    # cluster graph, distance field), so the timed trials measure queries. As in
+    # timeit, the garbage collector is paused while timing. Peak memory comes from
+    # one extra run under tracemalloc, kept out of the timings because tracing
+    # slows allocation down.
+    agent = DeliveryAgent(env)
+    run = ALGORITHMS[algo]
+    for _ in range(warmup):
+        run(agent)
+
+    durations = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(trials):
+            start_timer = time.perf_counter_ns()
+            result = run(agent)
+            durations.append(time.perf_counter_ns() - start_timer)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        run(agent)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'algorithm': algo, 'trials': trials,
+            'median_ns': int(statistics.median(durations)), 'min_ns': min(durations),
+            'mean_ns': int(statistics.mean(durations)),
+            'nodes_expanded': result['nodes_expanded'],
+            'cost': result['cost'] if result['path'] else None,
+            'path_length': len(result['path']) if result['path'] else 0,
+            'peak_memory_bytes': peak_memory}
+
+def run_suite(map_specs, algorithms, trials=5, warmup=1, compact=False, log=None):
+    # map_specs: [(label, filepath, parameters), ...]
+    results = []
+    for label, filepath, parameters in map_specs:
+        load_timer = time.perf_counter_ns()
+        env = GridCity(filepath, compact=compact)
+        load_ns = time.perf_counter_ns() - load_timer
+        for algo in algorithms:
+            row = {'map': label, 'load_ns': load_ns}
+            row.update(parameters)
+            row.update(benchmark_algorithm(env, algo, trials, warmup))
+            results.append(row)
+            if log:
+                log(row)
+    return results
+
+def compare_with_baseline(results, baseline, tolerance=0.15):
+    # Flags every (map, algorithm) pair that got slower or hungrier than the
+    # baseline by more than tolerance, expands more nodes, or returns a different
+    # cost. Times are compared on the fastest trial, which is the least noisy.
+    baseline_rows = {(row['map'], row['algorithm']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        previous = baseline_rows.get((row['map'], row['algorithm']))
+        if previous is None:
+            continue
+        key = (row['map'], row['algorithm'])
+        if (row['min_ns'] > previous['min_ns'] * (1 + tolerance) and
+                row['min_ns'] - previous['min_ns'] > NOISE_FLOOR_NS):
+            regressions.append(key + ('min_ns', previous['min_ns'], row['min_ns']))
+        if row['nodes_expanded'] > previous['nodes_expanded']:
+            regressions.append(key + ('nodes_expanded', previous['nodes_expanded'], row['nodes_expanded']))
+        if row['peak_memory_bytes'] > previous['peak_memory_bytes'] * (1 + tolerance):
+            regressions.append(key + ('peak_memory_bytes', previous['peak_memory_bytes'], row['peak_memory_bytes']))
+        if row['cost'] != previous['cost']:
+            regressions.append(key + ('cost', previous['cost'], row['cost']))
+    return regressions
+
+def print_row(row):
+    cost = '-' if row['cost'] is None else row['cost']
+    print(f"{row['map']:>32} {row['algorithm']:>15} {row['median_ns'] / 1e6:>11.3f} {row['min_ns'] / 1e6:>10.3f} "
+          f"{row['nodes_expanded']:>10} {cost:>8} {row['peak_memory_bytes'] / 1024:>11.1f}")
+    sys.stdout.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pathfinding algorithms in process")
+    parser.add_argument("--maps", type=str, nargs='+', help="Map files to use instead of synthetic maps")
+    parser.add_argument("--sizes", type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Synthetic map widths/heights (up to 4000; large sizes take minutes per algorithm)")
+    parser.add_argument("--densities", type=float, nargs='+', default=list(DEFAULT_DENSITIES),
+                        help="Share of synthetic cells that are obstacles")
+    parser.add_argument("--terrains", type=str, nargs='+', default=list(DEFAULT_TERRAINS),
+                        choices=sorted(TERRAIN_MIXES), help="Terrain cost mixes for synthetic maps")
+    parser.add_argument("--map-dir", type=str, default='bench_maps', help="Where synthetic maps are written")
+    parser.add_argument("--algos", type=str, nargs='+', default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument("--trials", type=int, default=5, help="Timed runs per algorithm and map")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs before the trials")
+    parser.add_argument("--compact", action='store_true', help="Load maps with the array-backed grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, help="Write the results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", type=str, help="Results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative slowdown / memory growth before a result counts as a regression")
+    args = parser.parse_args()
+
+    if args.maps:
+        map_specs = [(os.path.basename(filepath), filepath, {}) for filepath in args.maps]
+    else:
+        map_specs = []
+        for size in args.sizes:
+            for density in args.densities:
+                for terrain in args.terrains:
+                    filepath = synthetic_map_path(args.map_dir, size, density, terrain, args.seed)
+                    map_specs.append((os.path.basename(filepath)[:-4], filepath,
+                                      {'size': size, 'obstacle_density': density, 'terrain': terrain}))
+
+    print(f"{'Map':>32} {'Algorithm':>15} {'Median ms':>11} {'Min ms':>10} {'Expanded':>10} {'Cost':>8} "
+          f"{'Peak KiB':>11}")
+    results = run_suite(map_specs, args.algos, args.trials, args.warmup, args.compact, log=print_row)
+
+    if args.output:
+        output_data = {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'trials': args.trials,
+            'warmup': args.warmup,
+            'compact': args.compact,
+            'results': results
+        }
+        with open(args.output, 'w') as f:
+            json.dump(output_data, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        print(f"\n=== Compared with {args.baseline} ===")
+        for map_label, algo, metric, before, after in regressions:
+            print(f"REGRESSION {map_label} {algo}: {metric} {before} -> {after}")
+        if regressions:
+            return 1
+        print("No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# Cost-to-go fields from one or more source cells, for ETAs, heatmaps and search-free routing by gradient descent
+from array import array
+from environment import OBSTACLE_COST
+from jump_points import build_passable_costs
+
+UNREACHABLE = 0xFFFFFFFF
+MAX_CELL_COST = 9
+
+class DistanceField:
+    # distances[cell] is the cheapest cost of walking from cell to its nearest
+    # source, where entering a cell costs its terrain. Built on the map at t=0 as
+    # of env.version. A partial field (limit set) stopped propagating once a given
+    # cell was settled: values below limit are exact and every other cell is at
+    # least limit away, which lower_bound() reports.
+    def __init__(self, width, height, costs, sources, distances, version=0, expansions=0, limit=None):
+        self.width = width
+        self.height = height
+        self.costs = costs
+        self.sources = sources
+        self.distances = distances
+        self.version = version
+        self.expansions = expansions
+        self.limit = limit
+
+    def is_settled(self, position):
+        row, col = position
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return True
+        distance = self.distances[row * self.width + col]
+        return self.limit is None or distance < self.limit
+
+    def lower_bound(self, position):
+        row, col = position
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return float('inf')
+        distance = self.distances[row * self.width + col]
+        if self.limit is not None and distance >= self.limit:
+            return self.limit
+        return float('inf') if distance == UNREACHABLE else distance
+
+    def cost_to_go(self, position):
+        row, col = position
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            return float('inf')
+        distance = self.distances[row * self.width + col]
+        return float('inf') if distance == UNREACHABLE else distance
+
+    def descend(self, position):
+        # Follow the field downhill: from u step to a neighbor v with
+        # d(v) + c(v) == d(u) until a source (d == 0) is reached
+        width, height = self.width, self.height
+        distances, costs = self.distances, self.costs
+        if self.cost_to_go(position) == float('inf'):
+            return None
+        row, col = position
+        cell = row * width + col
+        path = [position]
+        while distances[cell]:
+            row, col = divmod(cell, width)
+            target = distances[cell]
+            for neighbor, inside in ((cell - width, row > 0), (cell + width, row < height - 1),
+                                     (cell - 1, col > 0), (cell + 1, col < width - 1)):
+                if inside and distances[neighbor] != UNREACHABLE and distances[neighbor] + costs[neighbor] == target:
+                    cell = neighbor
+                    break
+            path.append(divmod(cell, width))
+        return path
+
+    def nearest_source(self, position):
+        path = self.descend(position)
+        return path[-1] if path else None
+
+    def as_grid(self):
+        # Row lists for heatmaps, None where no source can be reached
+        width = self.width
+        return [[None if distance == UNREACHABLE else distance
+                 for distance in self.distances[row * width:(row + 1) * width]]
+                for row in range(self.height)]
+
+def _wavefront(costs, width, height, source_cells, stop_cell=None):
+    # Level-synchronous BFS for maps where every passable cell costs 1: each
+    # frontier list is one wave, so a cell's distance is the wave that reaches it
+    distances = array('I', [UNREACHABLE]) * (width * height)
+    for cell in source_cells:
+        distances[cell] = 0
+    frontier = list(source_cells)
+    expansion_count = 0
+    level = 0
+    while frontier:
+        if stop_cell is not None and distances[stop_cell] != UNREACHABLE:
+            return distances, expansion_count, level + 1
+        level += 1
+        expansion_count += len(frontier)
+        next_frontier = []
+        for cell in frontier:
+            row, col = divmod(cell, width)
+            for neighbor, inside in ((cell - width, row > 0), (cell + width, row < height - 1),
+                                     (cell - 1, col > 0), (cell + 1, col < width - 1)):
+                if inside and distances[neighbor] == UNREACHABLE and costs[neighbor] != OBSTACLE_COST:
+                    distances[neighbor] = level
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return distances, expansion_count, None
+
+def _dial(costs, width, height, source_cells, stop_cell=None):
+    # Dijkstra with a circular array of MAX_CELL_COST + 1 buckets (Dial's algorithm).
+    # The search runs backwards from the sources: reaching u from v means the
+    # forward move u -> v, which costs c(v), the cell being expanded.
+    distances = array('I', [UNREACHABLE]) * (width * height)
+    bucket_count = MAX_CELL_COST + 1
+    buckets = [[] for _ in range(bucket_count)]
+    for cell in source_cells:
+        distances[cell] = 0
+        buckets[0].append(cell)
+    pending = len(source_cells)
+    expansion_count = 0
+    current = 0
+    while pending:
+        bucket = buckets[current % bucket_count]
+        while bucket:
+            cell = bucket.pop()
+            pending -= 1
+            if distances[cell] != current:
+                continue
+            if cell == stop_cell:
+                return distances, expansion_count, current + 1
+            expansion_count += 1
+            new_distance = current + costs[cell]
+            row, col = divmod(cell, width)
+            for neighbor, inside in ((cell - width, row > 0), (cell + width, row < height - 1),
+                                     (cell - 1, col > 0), (cell + 1, col < width - 1)):
+                if inside and new_distance < distances[neighbor] and costs[neighbor] != OBSTACLE_COST:
+                    distances[neighbor] = new_distance
+                    buckets[new_distance % bucket_count].append(neighbor)
+                    pending += 1
+        current += 1
+    return distances, expansion_count, None
+
+def compute_distance_field(env, sources, mode='auto', include_dynamic=True, stop_at=None):
+    # mode is 'wavefront' (uniform-cost maps only), 'dial', or 'auto' to pick
+    # wavefront whenever every passable cell costs 1. include_dynamic=False leaves
+    # out obstacles scheduled at t=0, giving a lower bound for time-aware searches.
+    # stop_at=position returns a partial field as soon as that cell is settled.
+    width, height = env.width, env.height
+    costs = build_passable_costs(env) if include_dynamic else array('B', env.cell_costs)
+    uniform = not bytes(costs).translate(None, bytes([1, OBSTACLE_COST]))
+    if mode == 'auto':
+        mode = 'wavefront' if uniform else 'dial'
+    if mode == 'wavefront' and not uniform:
+        raise ValueError("wavefront mode needs a map where every passable cell costs 1")
+    if mode not in ('wavefront', 'dial'):
+        raise ValueError(f"Unknown distance field mode '{mode}'")
+
+    source_cells = sorted({row * width + col for row, col in sources
+                           if env.is_valid((row, col)) and costs[row * width + col] != OBSTACLE_COST})
+    stop_cell = None
+    if stop_at is not None and env.is_valid(stop_at):
+        stop_cell = stop_at[0] * width + stop_at[1]
+    propagate = _wavefront if mode == 'wavefront' else _dial
+    distances, expansion_count, limit = propagate(costs, width, height, source_cells, stop_cell)
+    return DistanceField(width, height, costs, [divmod(cell, width) for cell in source_cells], distances,
+                         env.version, expansion_count, limit)
+
+def get_distance_field(env, sources, mode='auto'):
+    # Cached on the GridCity per source set and mode, so a mode that does not fit
+    # the map still raises; fields from an older map version are dropped
+    key = (frozenset(sources), mode)
+    field = env.distance_fields.get(key)
+    if field is None or field.version != env.version:
+        env.distance_fields = {cached_key: cached for cached_key, cached in env.distance_fields.items()
+                               if cached.version == env.version}
+        field = compute_distance_field(env, key[0], mode)
+        env.distance_fields[key] = field
+    return field
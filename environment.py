@@ -1,52 +1,170 @@
 # GridCity environment class that manages the 2D grid world, obstacles, terrain costs, and agent navigation
+import mmap
+import os
+import struct
+from array import array
+
+OBSTACLE_COST = 0xFF
+NO_NEIGHBOR = -1
+
+# Map characters to cell costs in one bytes.translate() pass: '#' is an obstacle,
+# '2'-'9' are their own cost and everything else ('.', '1', 'S', 'G', ...) costs 1
+COST_TRANSLATION = bytes(
+    OBSTACLE_COST if byte == ord('#') else byte - ord('0') if ord('2') <= byte <= ord('9') else 1
+    for byte in range(256))
+PASSABLE_TRANSLATION = bytes(0 if byte == OBSTACLE_COST else 1 for byte in range(256))
+
+MAP_CACHE_MAGIC = b'GRDC'
+MAP_CACHE_VERSION = 2
+MAP_CACHE_HEADER = struct.Struct('<4sIIIiiiiqqII')
+
+def map_cache_path(map_filepath):
+    return os.path.splitext(map_filepath)[0] + '.gridc'
+
 class GridCity:
-    def __init__(self, map_filepath):
-        self.grid = []
-        self.static_obstacles = set()
+    def __init__(self, map_filepath, compact=False, use_cache=False):
+        self.map_filepath = map_filepath
+        self._grid = None
+        self._static_obstacles = None
         self.dynamic_obstacles = {}
         self.start_pos = None
         self.goal_pos = None
+        self.delivery_positions = []
         self.visited_cells = set()
         self.cell_visit_count = {}
         self.map_metadata = {'width': 0, 'height': 0, 'terrain_types': set()}
+        self.compact = False
+        self.cell_costs = None
+        self.neighbor_table = None
+        self.jump_tables = None
+        self.landmark_heuristic = None
+        self.hierarchy = None
+        self.distance_fields = {}
+        self.change_listeners = []
+        self.obstacle_index = {}
+        self.version = 0
         
-        self._load_map(map_filepath)
+        self._load_map(map_filepath, use_cache)
         self._setup_dynamic_obstacles()
-        self._analyze_terrain()
+        
+        if compact:
+            self.build_compact_grid()
     
-    def _load_map(self, map_filepath):
-        with open(map_filepath, 'r') as file:
-            lines = file.readlines()
+    def _load_map(self, map_filepath, use_cache=False):
+        # The text is parsed once into a flat uint8 cost buffer (cell_costs) along with
+        # start/goal and terrain types; grid and static_obstacles are derived lazily.
+        # With use_cache the buffer is also written to a .gridc file next to the map and
+        # memory-mapped from there on later loads, until the .txt changes.
+        if use_cache:
+            source = os.stat(map_filepath)
+            cache_path = map_cache_path(map_filepath)
+            if self._load_binary_map(cache_path, source.st_mtime_ns, source.st_size):
+                return
         
-        for row, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-                
-            grid_row = []
-            for col, char in enumerate(line):
-                if char == 'S':
-                    self.start_pos = (row, col)
-                    grid_row.append(1)
-                elif char == 'G':
-                    self.goal_pos = (row, col)
-                    grid_row.append(1)
-                elif char == '#':
-                    self.static_obstacles.add((row, col))
-                    grid_row.append(float('inf'))
-                elif char == '.' or char == '1':
-                    grid_row.append(1)
-                elif char.isdigit() and char != '0':
-                    grid_row.append(int(char))
-                else:
-                    grid_row.append(1)
-            
-            self.grid.append(grid_row)
+        self._parse_text_map(map_filepath)
+        if use_cache:
+            self.save_binary_map(cache_path, source.st_mtime_ns, source.st_size)
+    
+    def _parse_text_map(self, map_filepath):
+        with open(map_filepath, 'rb') as file:
+            rows = [line for line in (raw.strip() for raw in file) if line]
+        
+        width = len(rows[0]) if rows else 0
+        padding = bytes([OBSTACLE_COST]) * width
+        flat_costs = bytearray()
+        terrain_types = set()
+        for row, line in enumerate(rows):
+            start_col = line.find(b'S')
+            if start_col >= 0:
+                self.start_pos = (row, line.rfind(b'S'))
+            goal_col = line.find(b'G')
+            if goal_col >= 0:
+                self.goal_pos = (row, line.rfind(b'G'))
+            delivery_col = line.find(b'D')
+            while 0 <= delivery_col < width:
+                self.delivery_positions.append((row, delivery_col))
+                delivery_col = line.find(b'D', delivery_col + 1)
+            row_costs = line.translate(COST_TRANSLATION)
+            terrain_types.update(row_costs)
+            flat_costs += (row_costs + padding)[:width]
+        terrain_types.discard(OBSTACLE_COST)
         
-        self.height = len(self.grid)
-        self.width = len(self.grid[0]) if self.grid else 0
-        self.map_metadata['width'] = self.width
-        self.map_metadata['height'] = self.height
+        self._set_dimensions(width, len(rows))
+        self.cell_costs = array('B', flat_costs)
+        self.map_metadata['terrain_types'] = terrain_types
+    
+    def _set_dimensions(self, width, height):
+        self.width = width
+        self.height = height
+        self.map_metadata['width'] = width
+        self.map_metadata['height'] = height
+    
+    def save_binary_map(self, cache_path, source_mtime_ns=0, source_size=0):
+        # Layout: header, width * height cost bytes, then (row, col) int32 pairs for
+        # the delivery markers
+        start_row, start_col = self.start_pos or (-1, -1)
+        goal_row, goal_col = self.goal_pos or (-1, -1)
+        terrain_mask = 0
+        for cost in self.map_metadata['terrain_types']:
+            terrain_mask |= 1 << cost
+        with open(cache_path, 'wb') as file:
+            file.write(MAP_CACHE_HEADER.pack(MAP_CACHE_MAGIC, MAP_CACHE_VERSION, self.width, self.height,
+                                             start_row, start_col, goal_row, goal_col,
+                                             source_mtime_ns, source_size, terrain_mask,
+                                             len(self.delivery_positions)))
+            file.write(self.cell_costs)
+            array('i', [value for position in self.delivery_positions for value in position]).tofile(file)
+    
+    def _load_binary_map(self, cache_path, source_mtime_ns, source_size):
+        if not os.path.exists(cache_path):
+            return False
+        with open(cache_path, 'rb') as file:
+            header = file.read(MAP_CACHE_HEADER.size)
+            if len(header) != MAP_CACHE_HEADER.size:
+                return False
+            (magic, format_version, width, height, start_row, start_col, goal_row, goal_col,
+             saved_mtime, saved_size, terrain_mask, delivery_count) = MAP_CACHE_HEADER.unpack(header)
+            if (magic != MAP_CACHE_MAGIC or format_version != MAP_CACHE_VERSION or
+                    (saved_mtime, saved_size) != (source_mtime_ns, source_size)):
+                return False
+            cost_end = MAP_CACHE_HEADER.size + width * height
+            delivery_values = array('i')
+            if os.fstat(file.fileno()).st_size != cost_end + delivery_count * 2 * delivery_values.itemsize:
+                return False
+            if width * height == 0:
+                self.cell_costs = array('B')
+            else:
+                # Read-only mapping: pages are only faulted in as cells are touched
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.cell_costs = memoryview(mapped)[MAP_CACHE_HEADER.size:cost_end]
+            file.seek(cost_end)
+            delivery_values.fromfile(file, delivery_count * 2)
+        
+        self._set_dimensions(width, height)
+        self.start_pos = (start_row, start_col) if start_row >= 0 else None
+        self.goal_pos = (goal_row, goal_col) if goal_row >= 0 else None
+        self.delivery_positions = list(zip(delivery_values[0::2], delivery_values[1::2]))
+        self.map_metadata['terrain_types'] = {cost for cost in range(1, 10) if terrain_mask & (1 << cost)}
+        return True
+    
+    @property
+    def grid(self):
+        # Row lists with float('inf') for obstacles, built on first use
+        if self._grid is None:
+            width = self.width
+            cell_costs = self.cell_costs
+            self._grid = [[float('inf') if cost == OBSTACLE_COST else cost
+                           for cost in cell_costs[row * width:(row + 1) * width]]
+                          for row in range(self.height)]
+        return self._grid
+    
+    @property
+    def static_obstacles(self):
+        if self._static_obstacles is None:
+            width = self.width
+            self._static_obstacles = {divmod(cell, width) for cell, cost in enumerate(self.cell_costs)
+                                      if cost == OBSTACLE_COST}
+        return self._static_obstacles
     
     def _setup_dynamic_obstacles(self):
         self.dynamic_obstacles = {
@@ -54,11 +172,61 @@ class GridCity:
             5: [(2, 1), (2, 2)],
         }
     
-    def _analyze_terrain(self):
-        for row in self.grid:
-            for cell_cost in row:
-                if cell_cost != float('inf'):
-                    self.map_metadata['terrain_types'].add(cell_cost)
+    def build_compact_grid(self):
+        # 4-slot neighbor table per cell id (row * width + col) in up/down/left/right
+        # order, -1 where blocked. Each direction is built with one pass over a 0/1
+        # passability mask and then interleaved into the table.
+        width, height = self.width, self.height
+        cell_count = width * height
+        passable = bytes(self.cell_costs).translate(PASSABLE_TRANSLATION)
+        
+        up = [NO_NEIGHBOR] * width + [cell - width if open_cell else NO_NEIGHBOR
+                                      for cell, open_cell in zip(range(width, cell_count), passable)]
+        down = [cell + width if open_cell else NO_NEIGHBOR
+                for cell, open_cell in zip(range(cell_count - width), passable[width:])] + [NO_NEIGHBOR] * width
+        rows = range(0, cell_count, width)
+        left_passable = b''.join(b'\0' + passable[base:base + width - 1] for base in rows)
+        right_passable = b''.join(passable[base + 1:base + width] + b'\0' for base in rows)
+        left = [cell - 1 if open_cell else NO_NEIGHBOR for cell, open_cell in enumerate(left_passable)]
+        right = [cell + 1 if open_cell else NO_NEIGHBOR for cell, open_cell in enumerate(right_passable)]
+        
+        neighbor_table = array('i', [NO_NEIGHBOR]) * (4 * cell_count)
+        for slot, direction in enumerate((up, down, left, right)):
+            neighbor_table[slot::4] = array('i', direction)
+        
+        self.neighbor_table = neighbor_table
+        for position in self.dynamic_obstacles.get(0, []):
+            self._refresh_compact_cell(position)
+        self.compact = True
+    
+    def _refresh_compact_cell(self, position):
+        # Re-derive the table slots that point at this cell from its neighbors' side
+        if self.neighbor_table is None or not self.is_valid(position):
+            return
+        cell = self.cell_id(position)
+        blocked = (self.cell_costs[cell] == OBSTACLE_COST or
+                   position in self.dynamic_obstacles.get(0, ()))
+        width = self.width
+        row, col = position
+        table = self.neighbor_table
+        sources = (
+            (cell + width, 0) if row < self.height - 1 else None,
+            (cell - width, 1) if row > 0 else None,
+            (cell + 1, 2) if col < width - 1 else None,
+            (cell - 1, 3) if col > 0 else None,
+        )
+        for source in sources:
+            if source is None:
+                continue
+            neighbor, slot = source
+            table[4 * neighbor + slot] = NO_NEIGHBOR if blocked else cell
+    
+    def cell_id(self, position):
+        row, col = position
+        return row * self.width + col
+    
+    def cell_position(self, cell):
+        return divmod(cell, self.width)
     
     def mark_cell_visited(self, position):
         self.visited_cells.add(position)
@@ -79,7 +247,8 @@ class GridCity:
         row, col = position
         if not self.is_valid(position):
             return float('inf')
-        return self.grid[row][col]
+        cost = self.cell_costs[row * self.width + col]
+        return float('inf') if cost == OBSTACLE_COST else cost
     
     def is_valid(self, position):
         row, col = position
@@ -89,15 +258,27 @@ class GridCity:
         if not self.is_valid(position):
             return True
         
-        if position in self.static_obstacles:
+        row, col = position
+        if self.cell_costs[row * self.width + col] == OBSTACLE_COST:
             return True
         
         if time_step in self.dynamic_obstacles:
-            if position in self.dynamic_obstacles[time_step]:
+            if position in self.blocked_cells_at(time_step):
                 return True
         
         return False
     
+    def blocked_cells_at(self, time_step):
+        # Set view of dynamic_obstacles[time_step], rebuilt after add/remove touches that step
+        blocked = self.obstacle_index.get(time_step)
+        if blocked is None:
+            blocked = frozenset(self.dynamic_obstacles.get(time_step, ()))
+            self.obstacle_index[time_step] = blocked
+        return blocked
+    
+    def last_obstacle_time(self):
+        return max(self.dynamic_obstacles, default=-1)
+    
     def get_neighbors(self, position):
         row, col = position
         neighbors = []
@@ -112,14 +293,37 @@ class GridCity:
         
         return neighbors
     
+    def add_change_listener(self, callback):
+        self.change_listeners.append(callback)
+    
+    def remove_change_listener(self, callback):
+        if callback in self.change_listeners:
+            self.change_listeners.remove(callback)
+    
+    def _notify_change(self, position, time_step):
+        for callback in list(self.change_listeners):
+            callback(position, time_step)
+    
     def add_dynamic_obstacle(self, position, time_step):
         if time_step not in self.dynamic_obstacles:
             self.dynamic_obstacles[time_step] = []
         self.dynamic_obstacles[time_step].append(position)
+        self.obstacle_index.pop(time_step, None)
+        self.version += 1
+        if time_step == 0:
+            self._refresh_compact_cell(position)
+            self.jump_tables = None
+        self._notify_change(position, time_step)
     
     def remove_dynamic_obstacle(self, position, time_step):
         if time_step in self.dynamic_obstacles:
             if position in self.dynamic_obstacles[time_step]:
                 self.dynamic_obstacles[time_step].remove(position)
                 if not self.dynamic_obstacles[time_step]:
-                    del self.dynamic_obstacles[time_step]
\ No newline at end of file
+                    del self.dynamic_obstacles[time_step]
+                self.obstacle_index.pop(time_step, None)
+                self.version += 1
+                if time_step == 0:
+                    self._refresh_compact_cell(position)
+                    self.jump_tables = None
+                self._notify_change(position, time_step)
\ No newline at end of file
@@ -0,0 +1,159 @@
+# Prioritized multi-agent planning over a shared space-time ReservationTable, with per-agent path reuse on replanning
+import time
+from agent import DeliveryAgent
+from distance_field import compute_distance_field
+from utils import ReservationTable
+
+# Space-time states one agent's search may expand before it is counted as failed.
+# A goal sealed off by parked agents is otherwise only ruled out after exploring
+# every (cell, time) pair up to the reservation horizon.
+DEFAULT_SEARCH_BUDGET = 50000
+
+def position_at(path, time_step):
+    # Agents wait on their last cell once their path ends
+    return path[min(time_step, len(path) - 1)]
+
+def find_conflicts(paths):
+    # Vertex conflicts (two agents on one cell at t) and edge conflicts (two agents
+    # swapping cells between t and t + 1), found with one occupancy dict per step
+    live_paths = [(agent_index, path) for agent_index, path in enumerate(paths) if path]
+    last_step = max((len(path) for _, path in live_paths), default=0)
+    conflicts = []
+    for time_step in range(last_step):
+        occupancy = {}
+        for agent_index, path in live_paths:
+            position = position_at(path, time_step)
+            if position in occupancy:
+                conflicts.append(('vertex', time_step, occupancy[position], agent_index, position))
+            else:
+                occupancy[position] = agent_index
+        if time_step == 0:
+            continue
+        moves = {}
+        for agent_index, path in live_paths:
+            from_pos, to_pos = position_at(path, time_step - 1), position_at(path, time_step)
+            if from_pos != to_pos:
+                other = moves.get((to_pos, from_pos))
+                if other is not None:
+                    conflicts.append(('edge', time_step - 1, other, agent_index, (from_pos, to_pos)))
+                moves[(from_pos, to_pos)] = agent_index
+    return conflicts
+
+class FleetPlanner:
+    # Agents plan one at a time in priority order with space-time A* against a
+    # ReservationTable that holds every higher-priority path, then park on their
+    # goal. Every start cell is held at t=0, and an agent without a path is treated
+    # as waiting on its start cell; plan() retries with failed agents promoted to
+    # the front. When one agent's task changes, higher-priority agents are untouched
+    # and each lower-priority agent keeps its previous path if it is still
+    # conflict-free against the rebuilt table, so only agents the change actually
+    # blocks search again.
+    def __init__(self, environment, max_time=None, max_rounds=3, search_budget=DEFAULT_SEARCH_BUDGET):
+        self.env = environment
+        self.max_time = max_time
+        self.max_rounds = max_rounds
+        self.search_budget = search_budget
+        self.agent = DeliveryAgent(environment)
+        self.tasks = []
+        self.order = []
+        self.paths = []
+        self.costs = []
+        self.reservations = ReservationTable()
+        self.goal_fields = {}
+        self.searches = 0
+        self.reused = 0
+
+    def _reserve(self, table, agent_index):
+        path = self.paths[agent_index]
+        if path:
+            table.reserve_path(path)
+            table.park(path[-1], len(path) - 1)
+        else:
+            table.park(self.tasks[agent_index][0], 0)
+
+    def _path_is_free(self, path, table):
+        # Time 0 is the agent's fixed start, so only later steps are checked
+        for time_step in range(1, len(path)):
+            position = path[time_step]
+            if self.env.is_obstacle(position, time_step) or table.is_reserved(position, time_step):
+                return False
+            if time_step > 0 and table.is_edge_reserved(path[time_step - 1], position, time_step - 1):
+                return False
+        return table.can_park(path[-1], len(path) - 1)
+
+    def _goal_field(self, start_pos, goal_pos):
+        # Static cost-to-go to the goal, grown from the goal until the agent's start is
+        # settled: exact around the route and a lower bound beyond it. Kept per goal
+        # (and map version) so replanning an agent does not redo it.
+        field = self.goal_fields.get(goal_pos)
+        if field is None or field.version != self.env.version or not field.is_settled(start_pos):
+            field = compute_distance_field(self.env, [goal_pos], include_dynamic=False, stop_at=start_pos)
+            self.goal_fields[goal_pos] = field
+        return field
+
+    def _search(self, agent_index, table):
+        start_pos, goal_pos = self.tasks[agent_index]
+        self.agent.start_pos, self.agent.goal_pos = start_pos, goal_pos
+        result = self.agent.space_time_a_star(max_time=self.max_time, reservations=table, park_at_goal=True,
+                                              estimate=self._goal_field(start_pos, goal_pos).lower_bound,
+                                              max_expansions=self.search_budget)
+        self.searches += 1
+        self.paths[agent_index] = result['path']
+        self.costs[agent_index] = result['cost']
+        return result['nodes_expanded']
+
+    def _plan_from(self, first_rank, reuse):
+        # Rebuilds the reservation table, keeping agents ranked before first_rank as
+        # they are. Returns the nodes expanded.
+        table = ReservationTable()
+        # Every agent stands on its start at t=0, whatever its priority
+        for start_pos, _ in self.tasks:
+            table.reserve(start_pos, 0)
+        for agent_index in self.order[:first_rank]:
+            self._reserve(table, agent_index)
+        expansion_count = 0
+        for rank in range(first_rank, len(self.order)):
+            agent_index = self.order[rank]
+            path = self.paths[agent_index]
+            if (reuse and rank > first_rank and path and path[0] == self.tasks[agent_index][0] and
+                    self._path_is_free(path, table)):
+                self.reused += 1
+            else:
+                expansion_count += self._search(agent_index, table)
+            self._reserve(table, agent_index)
+        self.reservations = table
+        return expansion_count
+
+    def _result(self, expansion_count, execution_time):
+        failed = [agent_index for agent_index, path in enumerate(self.paths) if not path]
+        return {'paths': list(self.paths), 'costs': list(self.costs), 'priority_order': list(self.order),
+                'total_cost': sum(cost for cost in self.costs if cost != float('inf')),
+                'makespan': max((len(path) - 1 for path in self.paths if path), default=0),
+                'failed': failed, 'nodes_expanded': expansion_count, 'time': execution_time}
+
+    def plan(self, tasks):
+        # tasks: [(start_pos, goal_pos), ...], highest priority first
+        start_timer = time.perf_counter()
+        self.tasks = [(tuple(start_pos), tuple(goal_pos)) for start_pos, goal_pos in tasks]
+        self.order = list(range(len(self.tasks)))
+        expansion_count = 0
+        best = None
+        for _ in range(max(1, self.max_rounds)):
+            self.paths = [None] * len(self.tasks)
+            self.costs = [float('inf')] * len(self.tasks)
+            expansion_count += self._plan_from(0, reuse=False)
+            failed = [agent_index for agent_index in self.order if not self.paths[agent_index]]
+            if best is None or len(failed) < best[0]:
+                best = (len(failed), list(self.order), list(self.paths), list(self.costs), self.reservations)
+            if not failed:
+                break
+            self.order = failed + [agent_index for agent_index in self.order if self.paths[agent_index]]
+        _, self.order, self.paths, self.costs, self.reservations = best
+        return self._result(expansion_count, time.perf_counter() - start_timer)
+
+    def update_task(self, agent_index, start_pos=None, goal_pos=None):
+        start_timer = time.perf_counter()
+        old_start, old_goal = self.tasks[agent_index]
+        self.tasks[agent_index] = (tuple(start_pos or old_start), tuple(goal_pos or old_goal))
+        expansion_count = self._plan_from(self.order.index(agent_index), reuse=True)
+        return self._result(expansion_count, time.perf_counter() - start_timer)
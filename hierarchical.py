@@ -0,0 +1,258 @@
+# HPA* abstraction: grid clusters with entrance nodes and cached intra-cluster costs, repaired per cluster on obstacle changes
+import heapq
+from environment import OBSTACLE_COST
+from jump_points import build_passable_costs
+
+DEFAULT_CLUSTER_SIZE = 16
+# Open border runs at least this long get an entrance at each end instead of one in the middle
+WIDE_ENTRANCE = 6
+
+def get_hierarchy(env, cluster_size=DEFAULT_CLUSTER_SIZE):
+    hierarchy = env.hierarchy
+    if hierarchy is None or hierarchy.cluster_size != cluster_size:
+        if hierarchy is not None:
+            hierarchy.detach()
+        hierarchy = HierarchicalGraph(env, cluster_size)
+        env.hierarchy = hierarchy
+    return hierarchy
+
+class HierarchicalGraph:
+    # Abstract nodes are entrance cells on cluster borders. Moving u -> v costs the
+    # terrain of v, so edges are directed: an entrance pair (a, b) across a border
+    # gives a -> b costing c(b) and b -> a costing c(a). Intra-cluster edges are exact
+    # distances confined to the cluster; they are built the first time a search
+    # reaches the cluster and dropped when a cell in it changes at t=0.
+    def __init__(self, env, cluster_size=DEFAULT_CLUSTER_SIZE):
+        self.env = env
+        self.cluster_size = cluster_size
+        self.width = env.width
+        self.height = env.height
+        self.cluster_rows = -(-env.height // cluster_size)
+        self.cluster_cols = -(-env.width // cluster_size)
+        self.costs = build_passable_costs(env)
+        self.transitions = {}
+        self.entrances = {}
+        self.intra_edges = {}
+        self.cluster_builds = 0
+
+        clusters = [(cluster_row, cluster_col) for cluster_row in range(self.cluster_rows)
+                    for cluster_col in range(self.cluster_cols)]
+        for cluster in clusters:
+            for border in self._borders(cluster):
+                if border[0] == cluster:
+                    self._scan_border(border)
+        for cluster in clusters:
+            self._collect_entrances(cluster)
+        env.add_change_listener(self._on_obstacle_change)
+
+    def detach(self):
+        self.env.remove_change_listener(self._on_obstacle_change)
+
+    def _cluster_of(self, cell):
+        row, col = divmod(cell, self.width)
+        return (row // self.cluster_size, col // self.cluster_size)
+
+    def _bounds(self, cluster):
+        size = self.cluster_size
+        cluster_row, cluster_col = cluster
+        return (cluster_row * size, min((cluster_row + 1) * size, self.height),
+                cluster_col * size, min((cluster_col + 1) * size, self.width))
+
+    def _borders(self, cluster):
+        # Each border is keyed (upper or left cluster, lower or right cluster)
+        cluster_row, cluster_col = cluster
+        borders = []
+        if cluster_row > 0:
+            borders.append(((cluster_row - 1, cluster_col), cluster))
+        if cluster_row + 1 < self.cluster_rows:
+            borders.append((cluster, (cluster_row + 1, cluster_col)))
+        if cluster_col > 0:
+            borders.append(((cluster_row, cluster_col - 1), cluster))
+        if cluster_col + 1 < self.cluster_cols:
+            borders.append((cluster, (cluster_row, cluster_col + 1)))
+        return borders
+
+    def _scan_border(self, border):
+        first, second = border
+        row_start, row_end, col_start, col_end = self._bounds(first)
+        width = self.width
+        costs = self.costs
+        if first[0] == second[0]:
+            pairs = [(row * width + col_end - 1, row * width + col_end) for row in range(row_start, row_end)]
+        else:
+            pairs = [((row_end - 1) * width + col, row_end * width + col) for col in range(col_start, col_end)]
+
+        transitions = []
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and costs[pair[0]] != OBSTACLE_COST and costs[pair[1]] != OBSTACLE_COST:
+                run.append(pair)
+                continue
+            if len(run) >= WIDE_ENTRANCE:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+        self.transitions[border] = transitions
+
+    def _collect_entrances(self, cluster):
+        # entrances[cluster] maps each entrance cell to its edges into neighbor clusters
+        costs = self.costs
+        entrances = {}
+        for border in self._borders(cluster):
+            own_side = 0 if border[0] == cluster else 1
+            for pair in self.transitions[border]:
+                own, other = pair[own_side], pair[1 - own_side]
+                entrances.setdefault(own, []).append((other, costs[other]))
+        self.entrances[cluster] = entrances
+        self.intra_edges.pop(cluster, None)
+
+    def _cluster_edges(self, cluster):
+        edges = self.intra_edges.get(cluster)
+        if edges is None:
+            nodes = self.entrances[cluster]
+            edges = {}
+            for node in nodes:
+                distances, _, _ = self.search_cluster(node, cluster, nodes)
+                edges[node] = {other: distance for other, distance in distances.items()
+                               if other in nodes and other != node}
+            self.intra_edges[cluster] = edges
+            self.cluster_builds += 1
+        return edges
+
+    def _on_obstacle_change(self, position, time_step):
+        if time_step != 0 or not self.env.is_valid(position):
+            return
+        row, col = position
+        cell = row * self.width + col
+        self.costs[cell] = OBSTACLE_COST if self.env.is_obstacle(position) else self.env.cell_costs[cell]
+
+        # The cell's own cluster always changes; a cell on the cluster's edge also
+        # changes the entrances shared with the cluster across that edge
+        cluster = self._cluster_of(cell)
+        row_start, row_end, col_start, col_end = self._bounds(cluster)
+        touched = {cluster}
+        for border in self._borders(cluster):
+            other = border[1] if border[0] == cluster else border[0]
+            if ((other[0] < cluster[0] and row == row_start) or (other[0] > cluster[0] and row == row_end - 1) or
+                    (other[1] < cluster[1] and col == col_start) or (other[1] > cluster[1] and col == col_end - 1)):
+                self._scan_border(border)
+                touched.add(other)
+        for touched_cluster in touched:
+            self._collect_entrances(touched_cluster)
+
+    def search_cluster(self, source, cluster, targets):
+        # Dijkstra from source confined to one cluster, stopping once every target is
+        # settled. Returns (settled distances, parents, expansions).
+        row_start, row_end, col_start, col_end = self._bounds(cluster)
+        width = self.width
+        costs = self.costs
+        remaining = set(targets)
+        distances = {source: 0}
+        parents = {source: None}
+        settled = {}
+        heap = [(0, source)]
+        expansion_count = 0
+
+        while heap and remaining:
+            distance, cell = heapq.heappop(heap)
+            if cell in settled:
+                continue
+            settled[cell] = distance
+            expansion_count += 1
+            remaining.discard(cell)
+            row, col = divmod(cell, width)
+            for neighbor, inside in ((cell - width, row > row_start), (cell + width, row < row_end - 1),
+                                     (cell - 1, col > col_start), (cell + 1, col < col_end - 1)):
+                if not inside or costs[neighbor] == OBSTACLE_COST or neighbor in settled:
+                    continue
+                new_distance = distance + costs[neighbor]
+                if new_distance < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = new_distance
+                    parents[neighbor] = cell
+                    heapq.heappush(heap, (new_distance, neighbor))
+        return settled, parents, expansion_count
+
+    def find_path(self, start_cell, goal_cell):
+        # Returns (cell path, cost, nodes expanded); the path is None when unreachable
+        costs = self.costs
+        if costs[start_cell] == OBSTACLE_COST or costs[goal_cell] == OBSTACLE_COST:
+            return None, float('inf'), 0
+        if start_cell == goal_cell:
+            return [start_cell], 0, 0
+
+        # Temporarily connect start and goal to the entrances of their clusters. A
+        # path n -> goal costs d(goal -> n) + c(goal) - c(n), so one search from the
+        # goal gives every incoming edge.
+        start_cluster = self._cluster_of(start_cell)
+        goal_cluster = self._cluster_of(goal_cell)
+        start_targets = set(self.entrances[start_cluster])
+        if start_cluster == goal_cluster:
+            start_targets.add(goal_cell)
+        reached, _, expansion_count = self.search_cluster(start_cell, start_cluster, start_targets)
+        start_edges = {node: distance for node, distance in reached.items()
+                       if node in start_targets and node != start_cell}
+        goal_nodes = self.entrances[goal_cluster]
+        reached, _, goal_expansions = self.search_cluster(goal_cell, goal_cluster, goal_nodes)
+        expansion_count += goal_expansions
+        goal_edges = {node: distance + costs[goal_cell] - costs[node] for node, distance in reached.items()
+                      if node in goal_nodes and node != goal_cell}
+
+        width = self.width
+        goal_row, goal_col = divmod(goal_cell, width)
+        best = {start_cell: 0}
+        parents = {start_cell: None}
+        closed_nodes = set()
+        heap = [(0, 0, start_cell)]
+        while heap:
+            _, node_cost, node = heapq.heappop(heap)
+            if node in closed_nodes:
+                continue
+            closed_nodes.add(node)
+            expansion_count += 1
+            if node == goal_cell:
+                break
+
+            cluster = self._cluster_of(node)
+            if node == start_cell:
+                steps = list(start_edges.items())
+            else:
+                steps = list(self._cluster_edges(cluster).get(node, {}).items())
+            steps += self.entrances[cluster].get(node, [])
+            if node in goal_edges:
+                steps.append((goal_cell, goal_edges[node]))
+            for neighbor, step_cost in steps:
+                new_cost = node_cost + step_cost
+                if neighbor not in closed_nodes and new_cost < best.get(neighbor, float('inf')):
+                    best[neighbor] = new_cost
+                    parents[neighbor] = node
+                    row, col = divmod(neighbor, width)
+                    heapq.heappush(heap, (new_cost + abs(row - goal_row) + abs(col - goal_col), new_cost, neighbor))
+
+        if goal_cell not in closed_nodes:
+            return None, float('inf'), expansion_count
+
+        abstract_path = []
+        node = goal_cell
+        while node is not None:
+            abstract_path.append(node)
+            node = parents[node]
+        abstract_path.reverse()
+
+        # Refinement: border crossings are single steps, everything else is a search
+        # inside the one cluster both ends belong to
+        path = [start_cell]
+        for from_cell, to_cell in zip(abstract_path, abstract_path[1:]):
+            cluster = self._cluster_of(from_cell)
+            if cluster != self._cluster_of(to_cell):
+                path.append(to_cell)
+                continue
+            _, segment_parents, segment_expansions = self.search_cluster(from_cell, cluster, (to_cell,))
+            expansion_count += segment_expansions
+            segment = []
+            cell = to_cell
+            while cell != from_cell:
+                segment.append(cell)
+                cell = segment_parents[cell]
+            path.extend(reversed(segment))
+        return path, best[goal_cell], expansion_count
@@ -0,0 +1,158 @@
+# Incremental replanning with D* Lite that keeps its search state across GridCity obstacle changes
+from utils import MyPriorityQueue, calculate_manhattan_heuristic
+import time
+
+class IncrementalPlanner:
+    def __init__(self, environment, start_pos=None, goal_pos=None, time_step=0):
+        self.env = environment
+        self.start_pos = start_pos or environment.start_pos
+        self.goal_pos = goal_pos or environment.goal_pos
+        self.time_step = time_step
+        self.last_start = self.start_pos
+        self.key_modifier = 0
+        self.g_values = {}
+        self.rhs_values = {self.goal_pos: 0}
+        self.open_keys = {}
+        self.frontier = MyPriorityQueue()
+        self.pending_changes = set()
+        self.total_expansions = 0
+        self.replan_count = 0
+        self._insert(self.goal_pos)
+        environment.add_change_listener(self._on_obstacle_change)
+
+    def detach(self):
+        self.env.remove_change_listener(self._on_obstacle_change)
+
+    def _on_obstacle_change(self, position, time_step):
+        if time_step == self.time_step:
+            self.pending_changes.add(position)
+
+    def _g(self, node):
+        return self.g_values.get(node, float('inf'))
+
+    def _rhs(self, node):
+        return self.rhs_values.get(node, float('inf'))
+
+    def _is_blocked(self, node):
+        return self.env.is_obstacle(node, self.time_step)
+
+    def _adjacent(self, node):
+        row, col = node
+        for candidate in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if self.env.is_valid(candidate):
+                yield candidate
+
+    def _edge_cost(self, from_node, to_node):
+        if self._is_blocked(from_node) or self._is_blocked(to_node):
+            return float('inf')
+        return self.env.get_cost(to_node)
+
+    def _calculate_key(self, node):
+        best = min(self._g(node), self._rhs(node))
+        return (best + calculate_manhattan_heuristic(self.start_pos, node) + self.key_modifier, best)
+
+    def _insert(self, node):
+        key = self._calculate_key(node)
+        self.open_keys[node] = key
+        self.frontier.enqueue(node, key)
+
+    def _top(self):
+        # Lazy deletion: heap entries whose key no longer matches open_keys are stale
+        while not self.frontier.is_empty():
+            key = self.frontier.peek_priority()
+            node = self.frontier.peek()
+            if self.open_keys.get(node) == key:
+                return node, key
+            self.frontier.dequeue()
+        return None, (float('inf'), float('inf'))
+
+    def _update_vertex(self, node):
+        if node != self.goal_pos:
+            best = float('inf')
+            for successor in self._adjacent(node):
+                candidate = self._edge_cost(node, successor) + self._g(successor)
+                if candidate < best:
+                    best = candidate
+            self.rhs_values[node] = best
+        self.open_keys.pop(node, None)
+        if self._g(node) != self._rhs(node):
+            self._insert(node)
+
+    def _compute_shortest_path(self):
+        expansion_count = 0
+        while True:
+            node, old_key = self._top()
+            start_key = self._calculate_key(self.start_pos)
+            if node is None or (old_key >= start_key and self._rhs(self.start_pos) == self._g(self.start_pos)):
+                break
+            expansion_count += 1
+            new_key = self._calculate_key(node)
+            if old_key < new_key:
+                self._insert(node)
+            elif self._g(node) > self._rhs(node):
+                self.g_values[node] = self._rhs(node)
+                del self.open_keys[node]
+                for predecessor in self._adjacent(node):
+                    self._update_vertex(predecessor)
+            else:
+                self.g_values[node] = float('inf')
+                self._update_vertex(node)
+                for predecessor in self._adjacent(node):
+                    self._update_vertex(predecessor)
+        return expansion_count
+
+    def _extract_path(self):
+        if self._g(self.start_pos) == float('inf'):
+            return None, float('inf')
+        path = [self.start_pos]
+        total_cost = 0
+        current = self.start_pos
+        while current != self.goal_pos:
+            best_node, best_value = None, float('inf')
+            for successor in self._adjacent(current):
+                value = self._edge_cost(current, successor) + self._g(successor)
+                if value < best_value:
+                    best_node, best_value = successor, value
+            if best_node is None or len(path) > self.env.width * self.env.height:
+                return None, float('inf')
+            total_cost += self.env.get_cost(best_node)
+            path.append(best_node)
+            current = best_node
+        return path, total_cost
+
+    def replan(self, start_pos=None, time_step=None, compare_with_scratch=False):
+        start_timer = time.perf_counter()
+
+        if time_step is not None and time_step != self.time_step:
+            # Cells whose dynamic blocking differs between the two time steps changed
+            blocked_before = self.env.blocked_cells_at(self.time_step)
+            self.pending_changes |= blocked_before ^ self.env.blocked_cells_at(time_step)
+            self.time_step = time_step
+
+        if start_pos is not None and start_pos != self.start_pos:
+            self.start_pos = start_pos
+            self.key_modifier += calculate_manhattan_heuristic(self.last_start, start_pos)
+            self.last_start = start_pos
+
+        changed_cells = self.pending_changes
+        self.pending_changes = set()
+        for cell in changed_cells:
+            if not self.env.is_valid(cell):
+                continue
+            self._update_vertex(cell)
+            for neighbor in self._adjacent(cell):
+                self._update_vertex(neighbor)
+
+        expansion_count = self._compute_shortest_path()
+        self.total_expansions += expansion_count
+        self.replan_count += 1
+        path, total_cost = self._extract_path()
+        execution_time = time.perf_counter() - start_timer
+
+        result = {'path': path, 'cost': total_cost, 'nodes_expanded': expansion_count, 'time': execution_time,
+                  'changed_cells': len(changed_cells)}
+        if compare_with_scratch:
+            scratch = IncrementalPlanner(self.env, self.start_pos, self.goal_pos, self.time_step)
+            result['scratch_nodes_expanded'] = scratch.replan()['nodes_expanded']
+            scratch.detach()
+        return result
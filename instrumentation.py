@@ -0,0 +1,207 @@
+# Opt-in search instrumentation: counting frontier wrappers, latency histograms and sampled expansion traces
+from collections import deque
+
+# Upper bounds (seconds) of the latency histogram buckets; one more bucket holds the rest
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+SEARCH_COUNTERS = ('pushes', 'pops', 'stale_pops', 'neighbor_calls', 'nodes_expanded')
+
+class LatencyHistogram:
+    # Fixed buckets, so memory stays constant however many searches are observed.
+    # Percentiles interpolate linearly inside the bucket they fall in, clamped to
+    # the smallest and largest observation.
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(self.bounds) and seconds > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.total, 'min': self.min if self.count else 0.0, 'max': self.max,
+                'p50': self.percentile(0.5), 'p90': self.percentile(0.9), 'p99': self.percentile(0.99),
+                'buckets': dict(zip([str(bound) for bound in self.bounds] + ['+Inf'], self.counts))}
+
+class ProbeFrontier:
+    # Stands in for MyPriorityQueue/BucketPriorityQueue and counts through the probe
+    def __init__(self, frontier, probe):
+        self.frontier = frontier
+        self.probe = probe
+
+    def is_empty(self):
+        return self.frontier.is_empty()
+
+    def enqueue(self, item, priority):
+        self.probe.pushed()
+        self.frontier.enqueue(item, priority)
+
+    def dequeue(self):
+        item = self.frontier.dequeue()
+        self.probe.popped(item)
+        return item
+
+    def peek(self):
+        return self.frontier.peek()
+
+    def peek_priority(self):
+        return self.frontier.peek_priority()
+
+class ProbeDeque(deque):
+    # BFS queue that counts through the probe
+    def __init__(self, items, probe):
+        super().__init__()
+        self.probe = probe
+        for item in items:
+            self.append(item)
+
+    def append(self, item):
+        self.probe.pushed()
+        super().append(item)
+
+    def popleft(self):
+        item = super().popleft()
+        self.probe.popped(item)
+        return item
+
+class SearchProbe:
+    # Counters for one search. A pop of an item that was popped before in the same
+    # search counts as stale. With trace_limit the first trace_limit popped items
+    # are kept in order; log_every prints progress like the old debug mode.
+    def __init__(self, label, trace_limit=0, log_every=0):
+        self.label = label
+        self.pushes = 0
+        self.pops = 0
+        self.stale_pops = 0
+        self.neighbor_calls = 0
+        self.frontier_size = 0
+        self.peak_frontier = 0
+        self.popped_items = set()
+        self.trace_limit = trace_limit
+        self.trace = [] if trace_limit else None
+        self.log_every = log_every
+        self.wrapped_neighbors = False
+
+    def pushed(self):
+        self.pushes += 1
+        self.frontier_size += 1
+        if self.frontier_size > self.peak_frontier:
+            self.peak_frontier = self.frontier_size
+
+    def popped(self, item):
+        self.pops += 1
+        self.frontier_size -= 1
+        if item in self.popped_items:
+            self.stale_pops += 1
+        else:
+            self.popped_items.add(item)
+        if self.trace is not None and len(self.trace) < self.trace_limit:
+            self.trace.append(item)
+        if self.log_every and self.pops % self.log_every == 0:
+            print(f"Expanded {self.pops} nodes, current: {item}")
+
+    def frontier(self, frontier):
+        return ProbeFrontier(frontier, self)
+
+    def fifo(self, items):
+        return ProbeDeque(items, self)
+
+    def neighbors(self, get_neighbors):
+        self.wrapped_neighbors = True
+
+        def counted_neighbors(position):
+            self.neighbor_calls += 1
+            return get_neighbors(position)
+        return counted_neighbors
+
+class SearchInstrumentation:
+    # Aggregates SearchProbe counters per algorithm label. Every trace_every-th
+    # search records an expansion trace; the latest trace_history traces are kept.
+    def __init__(self, trace_every=0, trace_limit=1000, trace_history=10, bounds=LATENCY_BUCKETS):
+        self.trace_every = trace_every
+        self.trace_limit = trace_limit
+        self.bounds = bounds
+        self.search_count = 0
+        self.algorithms = {}
+        self.traces = deque(maxlen=trace_history)
+
+    def begin(self, label, log_every=0):
+        self.search_count += 1
+        sampled = self.trace_every and self.search_count % self.trace_every == 0
+        return SearchProbe(label, self.trace_limit if sampled else 0, log_every)
+
+    def finish(self, probe, result):
+        stats = self.algorithms.get(probe.label)
+        if stats is None:
+            stats = {'searches': 0, 'successful_searches': 0}
+            stats.update(dict.fromkeys(SEARCH_COUNTERS, 0))
+            stats.update({'peak_frontier': 0, 'latency': LatencyHistogram(self.bounds)})
+            self.algorithms[probe.label] = stats
+        stats['searches'] += 1
+        if result['path']:
+            stats['successful_searches'] += 1
+        stats['pushes'] += probe.pushes
+        stats['pops'] += probe.pops
+        stats['stale_pops'] += probe.stale_pops
+        # The compact grid reads neighbors straight from its table, once per expansion
+        stats['neighbor_calls'] += probe.neighbor_calls if probe.wrapped_neighbors else result['nodes_expanded']
+        stats['nodes_expanded'] += result['nodes_expanded']
+        stats['peak_frontier'] = max(stats['peak_frontier'], probe.peak_frontier)
+        stats['latency'].observe(result['time'])
+        if probe.trace is not None:
+            self.traces.append({'algorithm': probe.label, 'search': self.search_count,
+                                'nodes_expanded': result['nodes_expanded'], 'expansions': probe.trace})
+
+    def snapshot(self):
+        algorithms = {}
+        for label, stats in self.algorithms.items():
+            algorithms[label] = dict(stats, latency=stats['latency'].to_dict())
+        return {'searches': self.search_count, 'algorithms': algorithms, 'traces': list(self.traces)}
+
+    def to_prometheus(self, prefix='delivery_search'):
+        # Prometheus text exposition format, one series per algorithm label
+        lines = []
+        for counter in ('searches', 'successful_searches') + SEARCH_COUNTERS:
+            name = f"{prefix}_{counter}_total"
+            lines.append(f"# TYPE {name} counter")
+            for label, stats in self.algorithms.items():
+                lines.append(f'{name}{{algorithm="{label}"}} {stats[counter]}')
+        name = f"{prefix}_peak_frontier"
+        lines.append(f"# TYPE {name} gauge")
+        for label, stats in self.algorithms.items():
+            lines.append(f'{name}{{algorithm="{label}"}} {stats["peak_frontier"]}')
+        name = f"{prefix}_latency_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for label, stats in self.algorithms.items():
+            histogram = stats['latency']
+            cumulative = 0
+            for bound, bucket_count in zip(list(histogram.bounds) + ['+Inf'], histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{algorithm="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{algorithm="{label}"}} {histogram.total}')
+            lines.append(f'{name}_count{{algorithm="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+# JPS+ jump tables for 4-connected grids, cached on the GridCity instance they were built from
+from array import array
+from environment import OBSTACLE_COST
+
+UNIFORM_COST = 1
+# Same order as GridCity.get_neighbors: up, down, left, right
+UP, DOWN, LEFT, RIGHT = range(4)
+OPPOSITE = (DOWN, UP, RIGHT, LEFT)
+
+def get_jump_tables(env):
+    if env.jump_tables is None:
+        env.jump_tables = build_jump_tables(env)
+    return env.jump_tables
+
+def build_passable_costs(env):
+    width, height = env.width, env.height
+    blocked_now = env.dynamic_obstacles.get(0, [])
+    costs = array('B', env.cell_costs)
+    for row, col in blocked_now:
+        if 0 <= row < height and 0 <= col < width:
+            costs[row * width + col] = OBSTACLE_COST
+    return costs
+
+def build_jump_tables(env):
+    # A cell is "uniform" when it costs 1 and every passable neighbor costs 1 too.
+    # Jumps only run through uniform cells; anything else is a jump point that the
+    # search expands normally, which keeps the result optimal on mixed terrain.
+    width, height = env.width, env.height
+    costs = build_passable_costs(env)
+    cell_count = width * height
+
+    def walkable(row, col):
+        return 0 <= row < height and 0 <= col < width and costs[row * width + col] != OBSTACLE_COST
+
+    def free(row, col):
+        return 0 <= row < height and 0 <= col < width and costs[row * width + col] == UNIFORM_COST
+
+    uniform = bytearray(cell_count)
+    for cell in range(cell_count):
+        if costs[cell] != UNIFORM_COST:
+            continue
+        row, col = divmod(cell, width)
+        uniform[cell] = 1
+        for neighbor_row, neighbor_col in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if walkable(neighbor_row, neighbor_col) and costs[neighbor_row * width + neighbor_col] != UNIFORM_COST:
+                uniform[cell] = 0
+                break
+
+    # Positive entries are the distance to the next jump point in that direction,
+    # zero or negative entries are minus the number of free cells before a wall
+    jumps = tuple(array('i', [0]) * cell_count for _ in range(4))
+
+    def fill_horizontal(direction, step):
+        table = jumps[direction]
+        columns = range(width - 1, -1, -1) if step == 1 else range(width)
+        for row in range(height):
+            base = row * width
+            for col in columns:
+                next_col = col + step
+                if not walkable(row, col) or not walkable(row, next_col):
+                    continue
+                next_cell = base + next_col
+                forced = ((walkable(row - 1, next_col) and not free(row - 1, col)) or
+                          (walkable(row + 1, next_col) and not free(row + 1, col)))
+                if not uniform[next_cell] or forced:
+                    table[base + col] = 1
+                else:
+                    following = table[next_cell]
+                    table[base + col] = following + 1 if following > 0 else following - 1
+
+    def fill_vertical(direction, step):
+        table = jumps[direction]
+        rows = range(height - 1, -1, -1) if step == 1 else range(height)
+        for col in range(width):
+            for row in rows:
+                next_row = row + step
+                if not walkable(row, col) or not walkable(next_row, col):
+                    continue
+                next_cell = next_row * width + col
+                forced = ((walkable(next_row, col - 1) and not free(row, col - 1)) or
+                          (walkable(next_row, col + 1) and not free(row, col + 1)))
+                if (not uniform[next_cell] or forced or
+                        jumps[LEFT][next_cell] > 0 or jumps[RIGHT][next_cell] > 0):
+                    table[row * width + col] = 1
+                else:
+                    following = table[next_cell]
+                    table[row * width + col] = following + 1 if following > 0 else following - 1
+
+    # Vertical jumps stop wherever a horizontal jump would find something, so the
+    # horizontal tables have to exist first
+    fill_horizontal(LEFT, -1)
+    fill_horizontal(RIGHT, 1)
+    fill_vertical(UP, -1)
+    fill_vertical(DOWN, 1)
+
+    return {'costs': costs, 'uniform': uniform, 'jumps': jumps}
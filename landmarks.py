@@ -0,0 +1,208 @@
+# ALT (A*, landmarks, triangle inequality) heuristic with array-backed distance tables cached per map
+import argparse
+import heapq
+import os
+import random
+import struct
+from array import array
+from environment import GridCity, OBSTACLE_COST
+
+UNREACHABLE = 0xFFFFFFFF
+ALT_MAGIC = b'ALT2'
+ALT_HEADER = struct.Struct('<4sIIIIqq')
+DEFAULT_LANDMARK_COUNT = 8
+
+class LandmarkHeuristic:
+    # distances[k] holds d(L_k, v) for every cell id v. Moving u -> v costs the
+    # terrain of v, so the reverse distance is d(v, L) = d(L, v) - c(v) + c(L) and a
+    # single table per landmark gives both directed triangle-inequality bounds.
+    # Tables are built on the static map only. Dynamic obstacles, whether added
+    # or removed later, can only make true distances longer than the static ones,
+    # so the bounds stay admissible and never need rebuilding.
+    def __init__(self, width, height, cell_costs, landmarks, distances, landmark_count=DEFAULT_LANDMARK_COUNT):
+        self.width = width
+        self.height = height
+        self.cell_costs = cell_costs
+        self.landmarks = landmarks
+        self.distances = distances
+        self.landmark_count = landmark_count
+
+    def for_goal(self, goal_cell):
+        width = self.width
+        goal_row, goal_col = divmod(goal_cell, width)
+        cell_costs = self.cell_costs
+        goal_cost = cell_costs[goal_cell]
+        tables = [(table, table[goal_cell]) for table in self.distances if table[goal_cell] != UNREACHABLE]
+
+        def estimate(cell):
+            row, col = divmod(cell, width)
+            best = abs(row - goal_row) + abs(col - goal_col)
+            reverse_offset = goal_cost - cell_costs[cell]
+            for table, to_goal in tables:
+                to_cell = table[cell]
+                if to_cell == UNREACHABLE:
+                    continue
+                forward = to_goal - to_cell
+                backward = to_cell - to_goal + reverse_offset
+                if forward > best:
+                    best = forward
+                if backward > best:
+                    best = backward
+            return best
+
+        return estimate
+
+def _passable_costs(env):
+    # Same as env.cell_costs but with 0 for static obstacles. Dynamic obstacles are
+    # left out on purpose (see LandmarkHeuristic).
+    return array('B', bytes(env.cell_costs).replace(bytes([OBSTACLE_COST]), b'\0'))
+
+def _cell_neighbors(env, costs):
+    # Reads passability from costs rather than the compact neighbor table, which
+    # also reflects dynamic obstacles at t=0
+    width, height = env.width, env.height
+
+    def neighbors(cell):
+        row, col = divmod(cell, width)
+        result = []
+        for next_row, next_col in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if 0 <= next_row < height and 0 <= next_col < width and costs[next_row * width + next_col]:
+                result.append(next_row * width + next_col)
+        return result
+    return neighbors
+
+def dijkstra_distances(env, source_cell, costs, neighbors):
+    distances = array('I', [UNREACHABLE]) * (env.width * env.height)
+    distances[source_cell] = 0
+    heap = [(0, source_cell)]
+    while heap:
+        distance, cell = heapq.heappop(heap)
+        if distance > distances[cell]:
+            continue
+        for neighbor in neighbors(cell):
+            new_distance = distance + costs[neighbor]
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                heapq.heappush(heap, (new_distance, neighbor))
+    return distances
+
+def build_landmark_heuristic(env, landmark_count=DEFAULT_LANDMARK_COUNT, seed=0):
+    # Farthest-point selection: each new landmark is the reachable cell whose
+    # distance to the nearest landmark chosen so far is largest
+    costs = _passable_costs(env)
+    neighbors = _cell_neighbors(env, costs)
+    open_cells = [cell for cell in range(len(costs)) if costs[cell]]
+    if not open_cells:
+        return LandmarkHeuristic(env.width, env.height, costs, [], [], landmark_count)
+
+    seed_cell = random.Random(seed).choice(open_cells)
+    seed_distances = dijkstra_distances(env, seed_cell, costs, neighbors)
+    nearest = array('I', seed_distances)
+    landmarks, distances = [], []
+    for _ in range(landmark_count):
+        candidate = max(open_cells, key=lambda cell: nearest[cell] if nearest[cell] != UNREACHABLE else -1)
+        if nearest[candidate] == 0 or nearest[candidate] == UNREACHABLE:
+            break
+        table = dijkstra_distances(env, candidate, costs, neighbors)
+        landmarks.append(candidate)
+        distances.append(table)
+        for cell in open_cells:
+            if table[cell] < nearest[cell]:
+                nearest[cell] = table[cell]
+    return LandmarkHeuristic(env.width, env.height, costs, landmarks, distances, landmark_count)
+
+def landmark_cache_path(map_filepath):
+    return map_filepath + '.alt'
+
+def save_landmark_heuristic(heuristic, path, source_mtime_ns=0, source_size=0):
+    with open(path, 'wb') as file:
+        file.write(ALT_HEADER.pack(ALT_MAGIC, heuristic.width, heuristic.height, heuristic.landmark_count,
+                                   len(heuristic.landmarks), source_mtime_ns, source_size))
+        array('i', heuristic.landmarks).tofile(file)
+        for table in heuristic.distances:
+            table.tofile(file)
+
+def load_landmark_heuristic(path, costs, width, height, source_mtime_ns=0, source_size=0,
+                            landmark_count=DEFAULT_LANDMARK_COUNT):
+    with open(path, 'rb') as file:
+        header = file.read(ALT_HEADER.size)
+        if len(header) != ALT_HEADER.size:
+            return None
+        magic, saved_width, saved_height, saved_landmark_count, count, saved_mtime, saved_size = \
+            ALT_HEADER.unpack(header)
+        if (magic != ALT_MAGIC or (saved_width, saved_height) != (width, height) or
+                saved_landmark_count != landmark_count or
+                (saved_mtime, saved_size) != (source_mtime_ns, source_size)):
+            return None
+        landmarks = array('i')
+        landmarks.fromfile(file, count)
+        distances = []
+        for _ in range(count):
+            table = array('I')
+            table.fromfile(file, width * height)
+            distances.append(table)
+    return LandmarkHeuristic(width, height, costs, list(landmarks), distances, landmark_count)
+
+def get_landmark_heuristic(env, landmark_count=DEFAULT_LANDMARK_COUNT, save_to_disk=False):
+    # Cached on the GridCity instance; with save_to_disk the tables are also stored
+    # next to the map file and reused while the map file and landmark count are
+    # unchanged. Only static terrain goes into the tables, so obstacle updates
+    # never invalidate them.
+    cached = env.landmark_heuristic
+    if cached is not None and cached.landmark_count == landmark_count:
+        return cached
+
+    cache_path = None
+    if save_to_disk and env.map_filepath:
+        cache_path = landmark_cache_path(env.map_filepath)
+        source = os.stat(env.map_filepath)
+        if os.path.exists(cache_path):
+            loaded = load_landmark_heuristic(cache_path, _passable_costs(env), env.width, env.height,
+                                             source.st_mtime_ns, source.st_size, landmark_count)
+            if loaded is not None:
+                env.landmark_heuristic = loaded
+                return loaded
+
+    heuristic = build_landmark_heuristic(env, landmark_count)
+    if cache_path:
+        save_landmark_heuristic(heuristic, cache_path, source.st_mtime_ns, source.st_size)
+    env.landmark_heuristic = heuristic
+    return heuristic
+
+def expansion_report(map_filepaths, query_count=20, landmark_count=DEFAULT_LANDMARK_COUNT, seed=0):
+    from agent import DeliveryAgent
+    rows = []
+    for map_filepath in map_filepaths:
+        env = GridCity(map_filepath, compact=True)
+        get_landmark_heuristic(env, landmark_count)
+        agent = DeliveryAgent(env)
+        open_cells = [(row, col) for row in range(env.height) for col in range(env.width)
+                      if not env.is_obstacle((row, col))]
+        rng = random.Random(seed)
+        pairs = [(env.start_pos, env.goal_pos)] if env.start_pos and env.goal_pos else []
+        pairs += [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(query_count)]
+        totals = {'manhattan': 0, 'alt': 0}
+        for start_pos, goal_pos in pairs:
+            agent.start_pos, agent.goal_pos = start_pos, goal_pos
+            for heuristic in totals:
+                totals[heuristic] += agent.a_star(heuristic=heuristic)['nodes_expanded']
+        saved = totals['manhattan'] - totals['alt']
+        rows.append({'map': map_filepath, 'queries': len(pairs), 'manhattan_expanded': totals['manhattan'],
+                     'alt_expanded': totals['alt'],
+                     'saved_percent': 100.0 * saved / totals['manhattan'] if totals['manhattan'] else 0.0})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ALT and Manhattan heuristics for A*")
+    parser.add_argument("maps", nargs='+', help="Map files to report on")
+    parser.add_argument("--queries", type=int, default=20, help="Random query pairs per map")
+    parser.add_argument("--landmarks", type=int, default=8, help="Number of landmarks")
+    args = parser.parse_args()
+
+    print(f"{'Map':<30} {'Queries':>8} {'Manhattan':>10} {'ALT':>10} {'Saved':>8}")
+    for row in expansion_report(args.maps, args.queries, args.landmarks):
+        print(f"{row['map']:<30} {row['queries']:>8} {row['manhattan_expanded']:>10} "
+              f"{row['alt_expanded']:>10} {row['saved_percent']:>7.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -3,36 +3,211 @@ import argparse
 import sys
 import os
 import json
+import time
 from datetime import datetime
 from environment import GridCity
 from agent import DeliveryAgent
+from parallel import ParallelRouter
+from landmarks import get_landmark_heuristic
+from hierarchical import DEFAULT_CLUSTER_SIZE
+from fleet import FleetPlanner, find_conflicts
+
+def read_query_batches(query_file, batch_size):
+    batch = []
+    for line in query_file:
+        line = line.strip()
+        if not line:
+            continue
+        batch.append(json.loads(line))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def route_through_cache(agent, router, pairs, algo):
+    # The route cache lives in this process, so hits are answered here and only
+    # the misses fan out to the workers, whose results then fill the cache
+    cache = agent.route_cache
+    version = agent.env.version
+    start_timer = time.perf_counter()
+    results = [None] * len(pairs)
+    misses = []
+    for index, (start_pos, goal_pos) in enumerate(pairs):
+        cached = cache.get(version, start_pos, goal_pos, (algo,))
+        if cached is not None:
+            results[index] = dict(cached, time=time.perf_counter() - start_timer, cached=True)
+        else:
+            misses.append(index)
+    routed = router.route([pairs[index] for index in misses], algo=algo) if misses else []
+    for index, result in zip(misses, routed):
+        start_pos, goal_pos = pairs[index]
+        cache.put(version, start_pos, goal_pos, (algo,), result)
+        results[index] = result
+    return results
+
+def run_query_file(agent, args):
+    # Streams one JSONL result per JSONL query ({"start": [r, c], "goal": [r, c], "id": ...})
+    if args.algo not in ('bfs', 'ucs', 'a_star'):
+        print(f"Error: --queries supports bfs, ucs and a_star, not {args.algo}")
+        sys.exit(1)
+    
+    router = ParallelRouter(agent.env, workers=args.workers) if args.workers > 1 else None
+    if router and agent.route_cache is not None:
+        route_batch = lambda pairs, algo: route_through_cache(agent, router, pairs, algo)
+    else:
+        route_batch = router.route if router else agent.route_many
+    out_file = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        with open(args.queries, 'r') as query_file:
+            for batch in read_query_batches(query_file, args.batch_size):
+                pairs = [(tuple(query['start']), tuple(query['goal'])) for query in batch]
+                for query, result in zip(batch, route_batch(pairs, algo=args.algo)):
+                    record = {'id': query.get('id'), 'start': query['start'], 'goal': query['goal']}
+                    record.update(result)
+                    # No path has an infinite cost, which JSON cannot represent
+                    if record['cost'] == float('inf'):
+                        record['cost'] = None
+                    out_file.write(json.dumps(record) + "\n")
+                out_file.flush()
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+        if router:
+            router.close()
+
+def export_metrics(agent, args):
+    # Search metrics collected by the agent's instrumentation, as JSON or Prometheus text
+    instrumentation = agent.instrumentation
+    if args.metrics == 'prometheus':
+        text = instrumentation.to_prometheus()
+    else:
+        text = json.dumps(instrumentation.snapshot(), indent=2) + "\n"
+    if args.metrics_file:
+        with open(args.metrics_file, 'w') as f:
+            f.write(text)
+        print(f"Metrics saved to {args.metrics_file}")
+    else:
+        print("\n=== Search Metrics ===")
+        print(text, end='')
+
+def run_fleet(env, args):
+    # One agent per JSONL line ({"start": [r, c], "goal": [r, c]}), highest priority first
+    if not args.agents:
+        print("Error: --algo fleet needs an --agents file")
+        sys.exit(1)
+    with open(args.agents, 'r') as agents_file:
+        tasks = [(tuple(task['start']), tuple(task['goal']))
+                 for task in (json.loads(line) for line in agents_file if line.strip())]
+
+    planner = FleetPlanner(env, max_time=args.max_time)
+    result = planner.plan(tasks)
+    print(f"Algorithm: FLEET ({len(tasks)} agents)")
+    for agent_index, (start_pos, goal_pos) in enumerate(tasks):
+        path = result['paths'][agent_index]
+        summary = f"cost {result['costs'][agent_index]}, {len(path) - 1} steps" if path else "no path"
+        print(f" -> Agent {agent_index}: {start_pos} -> {goal_pos}: {summary}")
+    if result['failed']:
+        print(f"Failed Agents: {result['failed']}")
+    print(f"Total Cost: {result['total_cost']}")
+    print(f"Makespan: {result['makespan']}")
+    print(f"Conflicts: {len(find_conflicts(result['paths']))}")
+    print(f"Nodes Expanded: {result['nodes_expanded']}")
+    print(f"Time Taken: {result['time']:.6f} seconds")
+
+    if args.output:
+        output_data = {
+            'timestamp': datetime.now().isoformat(),
+            'map_file': args.map,
+            'algorithm': args.algo,
+            'tasks': tasks,
+            'result': result
+        }
+        with open(args.output, 'w') as f:
+            json.dump(output_data, f, indent=2)
+        print(f"\nResults saved to {args.output}")
 
 def main():
     parser = argparse.ArgumentParser(description="Run Autonomous Delivery Agent")
     parser.add_argument("--map", type=str, required=True, help="Path to map file.")
     parser.add_argument("--algo", type=str, required=True,
-                        choices=['bfs', 'ucs', 'a_star', 'dynamic_demo'],
+                        choices=['bfs', 'ucs', 'a_star', 'bidirectional', 'jps', 'hpa_star', 'distance_field',
+                                 'multi_stop', 'space_time', 'fleet', 'ara_star', 'dynamic_demo'],
                         help="Algorithm to use.")
     parser.add_argument("--debug", action='store_true', help="Enable debug mode")
     parser.add_argument("--stats", action='store_true', help="Show performance statistics")
     parser.add_argument("--output", type=str, help="Save results to JSON file")
+    parser.add_argument("--compact", action='store_true', help="Use the flat array-backed grid and integer cell ids")
+    parser.add_argument("--map-cache", action='store_true',
+                        help="Store/reuse the parsed map in a binary .gridc file next to the map")
+    parser.add_argument("--cluster-size", type=int, default=DEFAULT_CLUSTER_SIZE,
+                        help="Cluster width/height used by hpa_star")
+    parser.add_argument("--field-mode", type=str, default='auto', choices=['auto', 'wavefront', 'dial'],
+                        help="How distance_field propagates: wavefront (uniform-cost maps) or Dial's bucket Dijkstra")
+    parser.add_argument("--max-time", type=int, help="Latest time step space_time and fleet may plan to")
+    parser.add_argument("--agents", type=str,
+                        help="JSONL file of start/goal pairs planned together by fleet, highest priority first")
+    parser.add_argument("--incremental", action='store_true',
+                        help="Use the D* Lite incremental planner in dynamic_demo")
+    parser.add_argument("--closed-set", action='store_true',
+                        help="Use the closed-set search core for ucs/a_star (skips stale frontier entries)")
+    parser.add_argument("--queue", type=str, default='heap', choices=['heap', 'bucket'],
+                        help="Frontier used by ucs/a_star: binary heap or monotone bucket queue")
+    parser.add_argument("--heuristic", type=str, default='manhattan', choices=['manhattan', 'terrain', 'alt'],
+                        help="Heuristic used by a_star and ara_star")
+    parser.add_argument("--weight", type=float,
+                        help="Heuristic weight: weighted A* for a_star (default 1), initial weight for ara_star (default 3)")
+    parser.add_argument("--time-budget", type=float, default=0.5,
+                        help="Seconds ara_star may spend refining, or multi_stop may spend ordering stops")
+    parser.add_argument("--return-to-start", action='store_true', help="End the multi_stop route back at S")
+    parser.add_argument("--save-landmarks", action='store_true',
+                        help="Store/reuse the ALT landmark tables in a .alt file next to the map")
+    parser.add_argument("--queries", type=str,
+                        help="JSONL file of start/goal pairs to route in batch; results are streamed as JSONL")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Queries routed per batch with --queries")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes used to route --queries batches")
+    parser.add_argument("--route-cache", type=int, default=0,
+                        help="Keep up to N routes in an LRU cache so repeated --queries pairs are not searched again")
+    parser.add_argument("--metrics", type=str, choices=['json', 'prometheus'],
+                        help="Instrument bfs/ucs/a_star searches and export their counters and latency histograms")
+    parser.add_argument("--metrics-file", type=str, help="Write --metrics output to this file instead of stdout")
+    parser.add_argument("--trace-every", type=int, default=0,
+                        help="With --metrics, record the expansion order of every Nth search")
     args = parser.parse_args()
 
     if not os.path.exists(args.map):
         print(f"Error: Map file '{args.map}' not found!")
         sys.exit(1)
+    # Batch routing grows shared search trees outside the per-search instrumentation
+    if args.metrics and args.queries:
+        print("Error: --metrics is not supported with --queries")
+        sys.exit(1)
 
     try:
-        env = GridCity(args.map)
+        env = GridCity(args.map, compact=args.compact, use_cache=args.map_cache)
         agent = DeliveryAgent(env)
         
         if args.debug:
             agent.enable_debug_mode()
         
+        if args.route_cache:
+            agent.enable_route_cache(args.route_cache)
+        
+        if args.metrics:
+            agent.enable_instrumentation(trace_every=args.trace_every)
+        
+        if args.queries:
+            run_query_file(agent, args)
+            return
+        
+        if args.algo == 'fleet':
+            run_fleet(env, args)
+            return
+        
         if not env.start_pos:
             print("Error: No start position (S) found in the map!")
             sys.exit(1)
-        if not env.goal_pos:
+        if not env.goal_pos and args.algo != 'multi_stop':
             print("Error: No goal position (G) found in the map!")
             sys.exit(1)
 
@@ -40,16 +215,38 @@ def main():
         print(f"Start position: {env.start_pos}")
         print(f"Goal position: {env.goal_pos}")
         print(f"Terrain types found: {sorted(env.map_metadata['terrain_types'])}")
+        if env.delivery_positions:
+            print(f"Delivery stops: {len(env.delivery_positions)}")
         print()
 
         if args.algo == 'bfs':
             result = agent.bfs()
         elif args.algo == 'ucs':
-            result = agent.ucs()
+            result = agent.ucs(closed_set=args.closed_set, queue=args.queue)
         elif args.algo == 'a_star':
-            result = agent.a_star()
+            if args.heuristic == 'alt':
+                get_landmark_heuristic(env, save_to_disk=args.save_landmarks)
+            result = agent.a_star(closed_set=args.closed_set, heuristic=args.heuristic, weight=args.weight or 1,
+                                  queue=args.queue)
+        elif args.algo == 'bidirectional':
+            result = agent.bidirectional()
+        elif args.algo == 'jps':
+            result = agent.jump_point_search()
+        elif args.algo == 'distance_field':
+            result = agent.distance_field_route(mode=args.field_mode)
+        elif args.algo == 'hpa_star':
+            result = agent.hpa_star(cluster_size=args.cluster_size)
+        elif args.algo == 'ara_star':
+            if args.heuristic == 'alt':
+                get_landmark_heuristic(env, save_to_disk=args.save_landmarks)
+            result = agent.ara_star(initial_weight=args.weight or 3.0, time_budget=args.time_budget,
+                                    heuristic=args.heuristic)
+        elif args.algo == 'multi_stop':
+            result = agent.plan_deliveries(time_budget=args.time_budget, return_to_start=args.return_to_start)
+        elif args.algo == 'space_time':
+            result = agent.space_time_a_star(max_time=args.max_time)
         elif args.algo == 'dynamic_demo':
-            log = agent.dynamic_replanning_demo()
+            log = agent.dynamic_replanning_demo(incremental=args.incremental)
             print(log)
             return
 
@@ -60,6 +257,16 @@ def main():
             print(f" -> Path Length: {len(result['path'])}")
             print(f" -> Path: {result['path']}")
         print(f"Nodes Expanded: {result['nodes_expanded']}")
+        if 'suboptimality_bound' in result:
+            print(f"Suboptimality Bound: {result['suboptimality_bound']:.3f}")
+        if 'stop_order' in result:
+            print(f"Stop Order: {result['stop_order']}")
+            if result['unreachable_stops']:
+                print(f"Unreachable Stops: {result['unreachable_stops']}")
+        if 'arrival_time' in result:
+            print(f"Arrival Time Step: {result['arrival_time']}")
+        if 'pops' in result:
+            print(f"Frontier Pops: {result['pops']} ({result['pops'] - result['unique_expansions']} stale)")
         print(f"Time Taken: {result['time']:.6f} seconds")
         
         if args.stats:
@@ -80,6 +287,9 @@ def main():
             with open(args.output, 'w') as f:
                 json.dump(output_data, f, indent=2)
             print(f"\nResults saved to {args.output}")
+        
+        if args.metrics:
+            export_metrics(agent, args)
 
     except Exception as e:
         print(f"Error: {str(e)}")
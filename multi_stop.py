@@ -0,0 +1,67 @@
+# Stop ordering for multi-parcel delivery runs: nearest neighbor construction improved by 2-opt and Or-opt moves
+import time
+
+def route_cost(order, leg_costs, return_to_start=False):
+    # order starts with the depot (index 0); leg_costs[a][b] is the cost of a -> b
+    total = 0
+    for from_stop, to_stop in zip(order, order[1:]):
+        total += leg_costs[from_stop][to_stop]
+    if return_to_start and len(order) > 1:
+        total += leg_costs[order[-1]][order[0]]
+    return total
+
+def nearest_neighbor_order(leg_costs, stops):
+    order = [0]
+    remaining = set(stops)
+    while remaining:
+        current = order[-1]
+        next_stop = min(remaining, key=lambda stop: (leg_costs[current][stop], stop))
+        order.append(next_stop)
+        remaining.discard(next_stop)
+    return order
+
+def _two_opt_pass(order, leg_costs, return_to_start, deadline):
+    # Reverses order[i:j + 1]. Leg costs are asymmetric (entering a cell costs its
+    # terrain), so each candidate is priced over the whole route.
+    best_cost = route_cost(order, leg_costs, return_to_start)
+    improved = False
+    for i in range(1, len(order) - 1):
+        for j in range(i + 1, len(order)):
+            candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+            candidate_cost = route_cost(candidate, leg_costs, return_to_start)
+            if candidate_cost < best_cost:
+                order, best_cost, improved = candidate, candidate_cost, True
+            if time.perf_counter() > deadline:
+                return order, improved
+    return order, improved
+
+def _or_opt_pass(order, leg_costs, return_to_start, deadline):
+    # Moves runs of 1-3 consecutive stops to another position in the route
+    best_cost = route_cost(order, leg_costs, return_to_start)
+    improved = False
+    for run_length in (1, 2, 3):
+        for i in range(1, len(order) - run_length + 1):
+            run = order[i:i + run_length]
+            rest = order[:i] + order[i + run_length:]
+            for j in range(1, len(rest) + 1):
+                if j == i:
+                    continue
+                candidate = rest[:j] + run + rest[j:]
+                candidate_cost = route_cost(candidate, leg_costs, return_to_start)
+                if candidate_cost < best_cost:
+                    order, best_cost, improved = candidate, candidate_cost, True
+                    break
+            if time.perf_counter() > deadline:
+                return order, improved
+    return order, improved
+
+def order_stops(leg_costs, stops, time_budget=0.5, return_to_start=False):
+    # Returns the visiting order as indices into leg_costs, starting with the depot 0
+    deadline = time.perf_counter() + time_budget
+    order = nearest_neighbor_order(leg_costs, stops)
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        order, two_opt_improved = _two_opt_pass(order, leg_costs, return_to_start, deadline)
+        order, or_opt_improved = _or_opt_pass(order, leg_costs, return_to_start, deadline)
+        improved = two_opt_improved or or_opt_improved
+    return order
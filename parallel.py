@@ -0,0 +1,133 @@
+# Process-pool execution of route batches; workers inherit the compact grid once instead of receiving it per task
+import argparse
+import copy
+import math
+import multiprocessing
+import os
+import random
+import time
+from array import array
+from environment import GridCity
+from agent import DeliveryAgent
+
+_inherited_env = None
+_worker_agent = None
+
+def _init_worker(environment=None):
+    global _worker_agent
+    _worker_agent = DeliveryAgent(environment if environment is not None else _inherited_env)
+
+def _route_chunk(task):
+    algo, chunk = task
+    pairs = [(start_pos, goal_pos) for _, start_pos, goal_pos in chunk]
+    results = _worker_agent.route_many(pairs, algo=algo)
+    return [(index, result) for (index, _, _), result in zip(chunk, results)]
+
+class ParallelRouter:
+    # With the fork start method the workers inherit the parent's GridCity, whose
+    # cost buffer and neighbor table are flat arrays that stay shared copy-on-write.
+    # Elsewhere a copy of the environment is pickled once per worker at start-up.
+    # Workers see the map as it was when the router was created. The neighbor table
+    # is built if missing, but the caller's map keeps its own compact setting.
+    def __init__(self, environment, workers=None, chunks_per_worker=4):
+        global _inherited_env
+        if environment.neighbor_table is None:
+            compact = environment.compact
+            environment.build_compact_grid()
+            environment.compact = compact
+        self.env = environment
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            _inherited_env = environment
+            context = multiprocessing.get_context('fork')
+            self.pool = context.Pool(self.workers, initializer=_init_worker)
+        else:
+            # Costs loaded from the map cache are a view over an mmap, which cannot be
+            # pickled, and change listeners (route caches) are of no use to a worker
+            worker_env = copy.copy(environment)
+            worker_env.cell_costs = array('B', environment.cell_costs)
+            worker_env.change_listeners = []
+            context = multiprocessing.get_context()
+            self.pool = context.Pool(self.workers, initializer=_init_worker, initargs=(worker_env,))
+
+    def route(self, pairs, algo='a_star'):
+        if algo not in ('bfs', 'ucs', 'a_star'):
+            raise ValueError(f"ParallelRouter does not support algorithm '{algo}'")
+        # Chunks are built from whole same-start groups so each worker can still
+        # answer a start's queries from a single search tree
+        ordered = sorted(((index, tuple(start_pos), tuple(goal_pos))
+                          for index, (start_pos, goal_pos) in enumerate(pairs)), key=lambda query: query[1])
+        chunk_size = max(1, math.ceil(len(ordered) / (self.workers * self.chunks_per_worker)))
+        tasks = []
+        chunk = []
+        for position, query in enumerate(ordered):
+            chunk.append(query)
+            next_start = ordered[position + 1][1] if position + 1 < len(ordered) else None
+            if len(chunk) >= chunk_size and next_start != query[1]:
+                tasks.append((algo, chunk))
+                chunk = []
+        if chunk:
+            tasks.append((algo, chunk))
+
+        results = [None] * len(pairs)
+        for chunk_results in self.pool.imap_unordered(_route_chunk, tasks):
+            for index, result in chunk_results:
+                results[index] = result
+        return results
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def random_query_pairs(environment, query_count, seed=0):
+    rng = random.Random(seed)
+    open_cells = [(row, col) for row in range(environment.height) for col in range(environment.width)
+                  if not environment.is_obstacle((row, col))]
+    return [(rng.choice(open_cells), rng.choice(open_cells)) for _ in range(query_count)]
+
+def benchmark_scaling(map_filepath, query_count=2000, worker_counts=(1, 2, 4, 8), algo='a_star', seed=0):
+    env = GridCity(map_filepath, compact=True)
+    pairs = random_query_pairs(env, query_count, seed)
+
+    rows = []
+    start_timer = time.perf_counter()
+    DeliveryAgent(env).route_many(pairs, algo=algo)
+    serial_time = time.perf_counter() - start_timer
+    rows.append({'workers': 0, 'seconds': serial_time, 'queries_per_second': query_count / serial_time,
+                 'speedup': 1.0})
+
+    for workers in worker_counts:
+        with ParallelRouter(env, workers=workers) as router:
+            router.route(pairs[:workers], algo=algo)
+            start_timer = time.perf_counter()
+            router.route(pairs, algo=algo)
+            elapsed = time.perf_counter() - start_timer
+        rows.append({'workers': workers, 'seconds': elapsed, 'queries_per_second': query_count / elapsed,
+                     'speedup': serial_time / elapsed})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel route batches")
+    parser.add_argument("--map", type=str, required=True, help="Path to map file.")
+    parser.add_argument("--algo", type=str, default='a_star', choices=['bfs', 'ucs', 'a_star'])
+    parser.add_argument("--queries", type=int, default=2000, help="Number of random query pairs")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4, 8], help="Worker counts to try")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"CPU cores available: {os.cpu_count()}")
+    print(f"{'Workers':>8} {'Seconds':>10} {'Queries/s':>12} {'Speedup':>8}")
+    for row in benchmark_scaling(args.map, args.queries, args.workers, args.algo, args.seed):
+        label = 'serial' if row['workers'] == 0 else row['workers']
+        print(f"{label:>8} {row['seconds']:>10.3f} {row['queries_per_second']:>12.1f} {row['speedup']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
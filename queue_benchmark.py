@@ -0,0 +1,57 @@
+# Microbenchmarks comparing the heapq-backed MyPriorityQueue with BucketPriorityQueue on large frontiers
+import argparse
+import random
+import time
+from utils import MyPriorityQueue, BucketPriorityQueue
+
+def fill_and_drain(queue_class, entry_count, seed=0):
+    # Push every entry with a random small-integer priority, then pop them all
+    rng = random.Random(seed)
+    priorities = [rng.randrange(entry_count // 10 + 1) for _ in range(entry_count)]
+    queue = queue_class()
+    start_timer = time.perf_counter()
+    for item, priority in enumerate(priorities):
+        queue.enqueue(item, priority)
+    while not queue.is_empty():
+        queue.dequeue()
+    return time.perf_counter() - start_timer
+
+def dijkstra_pattern(queue_class, entry_count, seed=0):
+    # Keeps a frontier of entry_count items: each pop pushes one replacement at the
+    # popped priority plus a terrain cost of 1-9, like a UCS frontier
+    rng = random.Random(seed)
+    steps = [rng.randint(1, 9) for _ in range(entry_count)]
+    queue = queue_class()
+    for item in range(entry_count):
+        queue.enqueue(item, steps[item])
+    start_timer = time.perf_counter()
+    for item in range(entry_count):
+        priority = queue.peek_priority()
+        queue.dequeue()
+        queue.enqueue(item, priority + steps[item])
+    return time.perf_counter() - start_timer
+
+def benchmark_queues(sizes=(10 ** 5, 10 ** 6), seed=0):
+    rows = []
+    for entry_count in sizes:
+        for workload, run in (('fill/drain', fill_and_drain), ('dijkstra', dijkstra_pattern)):
+            heap_seconds = run(MyPriorityQueue, entry_count, seed)
+            bucket_seconds = run(BucketPriorityQueue, entry_count, seed)
+            rows.append({'entries': entry_count, 'workload': workload, 'heap_seconds': heap_seconds,
+                         'bucket_seconds': bucket_seconds, 'speedup': heap_seconds / bucket_seconds})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MyPriorityQueue against BucketPriorityQueue")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[10 ** 5, 10 ** 6],
+                        help="Frontier sizes to try (10000000 takes a few minutes)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'Entries':>10} {'Workload':>12} {'Heap (s)':>10} {'Bucket (s)':>11} {'Speedup':>8}")
+    for row in benchmark_queues(args.sizes, args.seed):
+        print(f"{row['entries']:>10} {row['workload']:>12} {row['heap_seconds']:>10.3f} "
+              f"{row['bucket_seconds']:>11.3f} {row['speedup']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# Long-running routing service: keeps maps loaded and answers JSONL route requests over stdin/stdout or a local socket
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from environment import GridCity
+from agent import DeliveryAgent
+
+ROUTE_ALGORITHMS = ('bfs', 'ucs', 'a_star')
+OBSTACLE_OPERATIONS = ('add_obstacle', 'remove_obstacle')
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def parse_position(request, field):
+    # Checked per request so one malformed query cannot fail the batch it joins
+    value = request.get(field)
+    if not isinstance(value, (list, tuple)) or len(value) != 2 or not all(_is_int(part) for part in value):
+        raise ValueError(f"'{field}' must be a [row, col] pair of integers")
+    return tuple(value)
+
+class RoutingServer:
+    # Each map is loaded once with its compact grid (plus an optional route cache)
+    # and stays warm. Route requests for the same map and algorithm that arrive
+    # within batch_window seconds are answered by one route_many call, which grows
+    # one search tree per distinct start. Searches and obstacle updates run one at
+    # a time on a single worker thread in the order they were submitted, so the
+    # event loop keeps reading requests and answering deadlines meanwhile.
+    def __init__(self, map_paths, batch_window=0.002, max_batch=512, default_deadline=None, cache_capacity=0):
+        self.envs = {}
+        self.agents = {}
+        for name, map_filepath in map_paths.items():
+            env = GridCity(map_filepath, compact=True)
+            agent = DeliveryAgent(env)
+            if cache_capacity:
+                agent.enable_route_cache(cache_capacity)
+            self.envs[name] = env
+            self.agents[name] = agent
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.default_deadline = default_deadline
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = {}
+        self.flush_timers = {}
+        self.stats = {'requests': 0, 'routes': 0, 'batches': 0, 'deadline_misses': 0, 'obstacle_updates': 0,
+                      'errors': 0}
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _map_name(self, request):
+        name = request.get('map')
+        if name is None and len(self.envs) == 1:
+            return next(iter(self.envs))
+        if name is None:
+            raise ValueError(f"Request needs a 'map', one of {sorted(self.envs)}")
+        if name not in self.envs:
+            raise ValueError(f"Unknown map '{name}'")
+        return name
+
+    async def handle(self, request):
+        # Returns the response dict for one request; failures become {"error": ...}
+        self.stats['requests'] += 1
+        response = {'id': request.get('id')}
+        try:
+            operation = request.get('op', 'route')
+            if operation == 'route':
+                response.update(await self._route(request))
+            elif operation in OBSTACLE_OPERATIONS:
+                response.update(await self._update_obstacle(request, operation))
+            elif operation == 'stats':
+                response.update(self.get_stats())
+            else:
+                raise ValueError(f"Unknown op '{operation}'")
+        except asyncio.TimeoutError:
+            self.stats['deadline_misses'] += 1
+            response['error'] = 'deadline exceeded'
+        except (KeyError, TypeError, ValueError) as e:
+            self.stats['errors'] += 1
+            response['error'] = str(e)
+        return response
+
+    async def _route(self, request):
+        name = self._map_name(request)
+        algo = request.get('algo', 'a_star')
+        if algo not in ROUTE_ALGORITHMS:
+            raise ValueError(f"Unsupported algorithm '{algo}'")
+        start_pos, goal_pos = parse_position(request, 'start'), parse_position(request, 'goal')
+        deadline_ms = request.get('deadline_ms', self.default_deadline)
+        if deadline_ms is not None and (not isinstance(deadline_ms, (int, float)) or isinstance(deadline_ms, bool)):
+            raise ValueError("'deadline_ms' must be a number")
+        timeout = deadline_ms / 1000 if deadline_ms is not None else None
+
+        future = asyncio.get_running_loop().create_future()
+        key = (name, algo)
+        batch = self.pending.setdefault(key, [])
+        batch.append((start_pos, goal_pos, future))
+        if len(batch) >= self.max_batch:
+            self._flush_now(key)
+        elif len(batch) == 1:
+            self.flush_timers[key] = asyncio.get_running_loop().call_later(self.batch_window, self._flush_now, key)
+
+        # wait_for cancels the future on timeout, and the batch then skips the query
+        # if it has not started yet
+        result = await asyncio.wait_for(future, timeout)
+        self.stats['routes'] += 1
+        record = {'map': name, 'start': request['start'], 'goal': request['goal']}
+        record.update(result)
+        # No path has an infinite cost, which JSON cannot represent
+        if record['cost'] == float('inf'):
+            record['cost'] = None
+        return record
+
+    def _flush_now(self, key):
+        # Hands the batch to the worker thread right away, so its place in the
+        # worker's queue is fixed before any later request is submitted
+        timer = self.flush_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        name, algo = key
+        live = [(start_pos, goal_pos, future) for start_pos, goal_pos, future in self.pending.pop(key, [])
+                if not future.done()]
+        if not live:
+            return
+        self.stats['batches'] += 1
+        pairs = [(start_pos, goal_pos) for start_pos, goal_pos, _ in live]
+        routed = asyncio.get_running_loop().run_in_executor(self.executor, self.agents[name].route_many, pairs, algo)
+        routed.add_done_callback(lambda routed: self._deliver(live, routed))
+
+    def _deliver(self, live, routed):
+        if routed.exception() is not None:
+            error = ValueError(str(routed.exception()))
+            for _, _, future in live:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, _, future), result in zip(live, routed.result()):
+            if not future.done():
+                future.set_result(result)
+
+    async def _update_obstacle(self, request, operation):
+        # Queries for this map still waiting for their batch window are sent off
+        # first, so everything that arrived before the update is routed on the old
+        # map and everything after it on the new one
+        name = self._map_name(request)
+        env = self.envs[name]
+        position = parse_position(request, 'position')
+        time_step = request.get('time', 0)
+        if not _is_int(time_step) or time_step < 0:
+            raise ValueError("'time' must be a non-negative integer")
+        if not env.is_valid(position):
+            raise ValueError(f"Position {list(position)} is outside the map")
+        for key in [key for key in self.pending if key[0] == name]:
+            self._flush_now(key)
+        update = env.add_dynamic_obstacle if operation == 'add_obstacle' else env.remove_dynamic_obstacle
+        await asyncio.get_running_loop().run_in_executor(self.executor, update, position, time_step)
+        self.stats['obstacle_updates'] += 1
+        return {'map': name, 'version': env.version}
+
+    def get_stats(self):
+        maps = {name: dict(self.agents[name].get_performance_summary(), version=env.version,
+                           width=env.width, height=env.height)
+                for name, env in self.envs.items()}
+        return {'server': dict(self.stats), 'maps': maps}
+
+async def serve_lines(server, read_line, write_line):
+    # One task per request, so slow routes never hold up later requests; responses
+    # are written as they complete and carry the request id
+    tasks = set()
+
+    async def answer(line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            server.stats['errors'] += 1
+            response = {'id': None, 'error': f"Bad request: {e}"}
+        else:
+            response = await server.handle(request)
+        await write_line(json.dumps(response))
+
+    while True:
+        line = await read_line()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        task = asyncio.get_running_loop().create_task(answer(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+async def serve_stdio(server):
+    # stdin is read on the loop's default executor (not the search thread), which
+    # works whether it is a pipe, a terminal or a redirected file
+    loop = asyncio.get_running_loop()
+
+    async def read_line():
+        return await loop.run_in_executor(None, sys.stdin.readline)
+
+    async def write_line(text):
+        sys.stdout.write(text + "\n")
+        sys.stdout.flush()
+
+    await serve_lines(server, read_line, write_line)
+
+async def serve_socket(server, host=None, port=None, socket_path=None):
+    async def handle_connection(reader, writer):
+        async def write_line(text):
+            writer.write((text + "\n").encode())
+            await writer.drain()
+        try:
+            await serve_lines(server, reader.readline, write_line)
+        finally:
+            writer.close()
+
+    if socket_path:
+        listener = await asyncio.start_unix_server(handle_connection, path=socket_path, limit=2 ** 24)
+    else:
+        listener = await asyncio.start_server(handle_connection, host, port, limit=2 ** 24)
+    print(f"Serving on {socket_path or f'{host}:{port}'}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+def parse_map_specs(specs):
+    # "name=path" or just "path" (named after the file)
+    map_paths = {}
+    for spec in specs:
+        name, _, map_filepath = spec.rpartition('=')
+        map_paths[name or os.path.splitext(os.path.basename(map_filepath))[0]] = map_filepath
+    return map_paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve route requests against maps kept in memory")
+    parser.add_argument("--map", type=str, nargs='+', required=True,
+                        help="Map files to load, optionally as name=path; requests pick one with \"map\"")
+    parser.add_argument("--host", type=str, default='127.0.0.1', help="Address to listen on with --port")
+    parser.add_argument("--port", type=int, help="Serve over TCP instead of stdin/stdout")
+    parser.add_argument("--socket", type=str, help="Serve over a Unix domain socket instead of stdin/stdout")
+    parser.add_argument("--batch-window", type=float, default=2.0,
+                        help="Milliseconds to wait for more queries before routing a batch")
+    parser.add_argument("--max-batch", type=int, default=512, help="Queries that force a batch out immediately")
+    parser.add_argument("--deadline", type=float, help="Default per-request deadline in milliseconds")
+    parser.add_argument("--route-cache", type=int, default=0, help="Keep up to N routes per map in an LRU cache")
+    args = parser.parse_args()
+
+    map_paths = parse_map_specs(args.map)
+    for map_filepath in map_paths.values():
+        if not os.path.exists(map_filepath):
+            print(f"Error: Map file '{map_filepath}' not found!", file=sys.stderr)
+            sys.exit(1)
+
+    start_timer = time.perf_counter()
+    server = RoutingServer(map_paths, batch_window=args.batch_window / 1000, max_batch=args.max_batch,
+                           default_deadline=args.deadline, cache_capacity=args.route_cache)
+    print(f"Loaded {len(map_paths)} map(s) in {time.perf_counter() - start_timer:.3f} seconds", file=sys.stderr)
+    try:
+        if args.port is not None or args.socket:
+            asyncio.run(serve_socket(server, args.host, args.port, args.socket))
+        else:
+            asyncio.run(serve_stdio(server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
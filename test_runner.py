@@ -3,6 +3,24 @@ import subprocess
 import sys
 import os
 from pathlib import Path
+from environment import GridCity
+from agent import DeliveryAgent
+
+# Searches that must find a path exactly as cheap as UCS
+OPTIMAL_SEARCHES = {
+    'bidirectional': lambda agent: agent.bidirectional(),
+    'bidirectional_dijkstra': lambda agent: agent.bidirectional(use_heuristic=False),
+    'jps': lambda agent: agent.jump_point_search(),
+    'a_star': lambda agent: agent.a_star(),
+    'a_star_terrain': lambda agent: agent.a_star(heuristic='terrain'),
+    'a_star_alt': lambda agent: agent.a_star(heuristic='alt'),
+    'a_star_bucket': lambda agent: agent.a_star(queue='bucket'),
+    'a_star_closed_set': lambda agent: agent.a_star(closed_set=True),
+    'ucs_bucket': lambda agent: agent.ucs(queue='bucket'),
+    'ucs_closed_set': lambda agent: agent.ucs(closed_set=True),
+    'distance_field': lambda agent: agent.distance_field_route(),
+    'distance_field_dial': lambda agent: agent.distance_field_route(mode='dial'),
+}
 
 def run_algorithm_test(map_file, algorithm, debug=False):
     cmd = [sys.executable, 'main.py', '--map', map_file, '--algo', algorithm]
@@ -21,9 +39,44 @@ def run_algorithm_test(map_file, algorithm, debug=False):
     
     return result.returncode == 0
 
+def run_cost_check(map_file, compact=False, blocked_goal=None):
+    # In process: every optimal search has to match the UCS cost on this map.
+    # blocked_goal='dynamic' puts a t=0 obstacle on G, 'static' moves the goal
+    # onto a wall; either way no search may find a path.
+    mode = 'compact' if compact else 'dict'
+    variant = f", goal blocked ({blocked_goal})" if blocked_goal else ""
+    print(f"Checking optimal costs on {map_file} ({mode} grid{variant})...")
+    env = GridCity(map_file, compact=compact)
+    goal_pos = env.goal_pos
+    if blocked_goal == 'dynamic':
+        env.add_dynamic_obstacle(goal_pos, 0)
+    elif blocked_goal == 'static':
+        goal_pos = min(env.static_obstacles)
+    
+    def make_agent():
+        agent = DeliveryAgent(env)
+        agent.goal_pos = goal_pos
+        return agent
+    
+    expected = make_agent().ucs()['cost']
+    mismatches = []
+    if blocked_goal and expected != float('inf'):
+        mismatches.append(f"ucs: {expected} != inf for a blocked goal")
+    for name, run in OPTIMAL_SEARCHES.items():
+        cost = run(make_agent())['cost']
+        if cost != expected:
+            mismatches.append(f"{name}: {cost} != UCS {expected}")
+    
+    if mismatches:
+        print("❌ FAILED")
+        print("\n".join(mismatches))
+    else:
+        print(f"✅ SUCCESS ({len(OPTIMAL_SEARCHES)} searches, cost {expected})")
+    return not mismatches
+
 def main():
-    maps_dir = Path('maps')
-    algorithms = ['bfs', 'ucs', 'a_star', 'dynamic_demo']
+    maps_dir = Path('maps.txt')
+    algorithms = ['bfs', 'ucs', 'a_star', 'bidirectional', 'jps', 'hpa_star', 'distance_field', 'multi_stop', 'space_time', 'ara_star', 'dynamic_demo']
     
     print("🧪 Running comprehensive test suite...")
     print("=" * 50)
@@ -37,6 +90,12 @@ def main():
             if run_algorithm_test(str(map_file), algo):
                 passed_tests += 1
             print("-" * 30)
+        for compact in (False, True):
+            for blocked_goal in (None, 'dynamic', 'static'):
+                total_tests += 1
+                if run_cost_check(str(map_file), compact, blocked_goal):
+                    passed_tests += 1
+            print("-" * 30)
     
     print(f"\n📊 Test Results: {passed_tests}/{total_tests} tests passed")
     
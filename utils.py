@@ -1,5 +1,7 @@
 # Utility functions including priority queue implementation and Manhattan distance heuristic
 import heapq
+from array import array
+from collections import OrderedDict, deque
 
 class MyPriorityQueue:
     def __init__(self):
@@ -18,7 +20,210 @@ class MyPriorityQueue:
             raise IndexError("Queue is empty")
         return heapq.heappop(self.heap_data)[2]
 
+    def peek(self):
+        if self.is_empty():
+            raise IndexError("Queue is empty")
+        return self.heap_data[0][2]
+
+    def peek_priority(self):
+        if self.is_empty():
+            return float('inf')
+        return self.heap_data[0][0]
+
+class BucketPriorityQueue:
+    # Monotone bucket queue for integer priorities: one FIFO per priority value and a
+    # cursor that only moves up while priorities never drop below the last one
+    # dequeued, as with UCS costs and A* f-scores under a consistent heuristic.
+    # Equal priorities come out first-in first-out, like MyPriorityQueue. Infinite
+    # priorities (e.g. a heuristic towards a blocked goal) wait in an overflow FIFO.
+    def __init__(self):
+        self.buckets = {}
+        self.overflow = deque()
+        self.current = 0
+        self.size = 0
+
+    def is_empty(self):
+        return self.size == 0
+
+    def enqueue(self, item, priority):
+        self.size += 1
+        if priority == float('inf'):
+            self.overflow.append(item)
+            return
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = deque()
+            if priority < self.current:
+                self.current = priority
+        bucket.append(item)
+
+    def _front(self):
+        if self.size == 0:
+            raise IndexError("Queue is empty")
+        if self.size == len(self.overflow):
+            return self.overflow
+        buckets = self.buckets
+        bucket = buckets.get(self.current)
+        while not bucket:
+            if bucket is not None:
+                del buckets[self.current]
+            self.current += 1
+            bucket = buckets.get(self.current)
+        return bucket
+
+    def dequeue(self):
+        bucket = self._front()
+        self.size -= 1
+        return bucket.popleft()
+
+    def peek(self):
+        return self._front()[0]
+
+    def peek_priority(self):
+        if self.size == 0:
+            return float('inf')
+        if self._front() is self.overflow:
+            return float('inf')
+        return self.current
+
+PRIORITY_QUEUES = {'heap': MyPriorityQueue, 'bucket': BucketPriorityQueue}
+
+class SearchBuffers:
+    # Cell-indexed g-score/parent arrays reused across searches. Entries only count
+    # when their stamp matches the current generation, so reset() is O(1).
+    def __init__(self, cell_count):
+        self.cell_count = cell_count
+        self.cost = array('q', [0]) * cell_count
+        self.parent = array('i', [-1]) * cell_count
+        self.seen = array('I', [0]) * cell_count
+        self.closed = array('I', [0]) * cell_count
+        self.generation = 0
+
+    def reset(self):
+        self.generation += 1
+        if self.generation >= 0xFFFFFFFF:
+            self.seen = array('I', [0]) * self.cell_count
+            self.closed = array('I', [0]) * self.cell_count
+            self.generation = 1
+        return self.generation
+
+class ReservationTable:
+    # Space-time reservations: cells held at a time step, plus edges traversed
+    # between t and t + 1 so head-on swaps can be rejected too. A parked cell is
+    # held from its time step onwards (an agent waiting on its goal).
+    def __init__(self):
+        self.cells_by_time = {}
+        self.edges_by_time = {}
+        self.parked_from = {}
+        self.last_reserved = {}
+        self.last_time = -1
+
+    def reserve(self, position, time_step):
+        self.cells_by_time.setdefault(time_step, set()).add(position)
+        self.last_reserved[position] = max(self.last_reserved.get(position, -1), time_step)
+        self.last_time = max(self.last_time, time_step)
+
+    def reserve_edge(self, from_pos, to_pos, time_step):
+        self.edges_by_time.setdefault(time_step, set()).add((from_pos, to_pos))
+        self.last_time = max(self.last_time, time_step + 1)
+
+    def reserve_path(self, path, start_time=0):
+        for offset, position in enumerate(path):
+            self.reserve(position, start_time + offset)
+            if offset > 0:
+                self.reserve_edge(path[offset - 1], position, start_time + offset - 1)
+
+    def park(self, position, time_step):
+        self.parked_from[position] = min(self.parked_from.get(position, time_step), time_step)
+        self.last_time = max(self.last_time, time_step)
+
+    def is_reserved(self, position, time_step):
+        cells = self.cells_by_time.get(time_step)
+        if cells is not None and position in cells:
+            return True
+        parked = self.parked_from.get(position)
+        return parked is not None and time_step >= parked
+
+    def is_edge_reserved(self, from_pos, to_pos, time_step):
+        # A move a -> b conflicts with a reserved b -> a over the same interval
+        edges = self.edges_by_time.get(time_step)
+        return edges is not None and (to_pos, from_pos) in edges
+
+    def can_park(self, position, time_step):
+        # True when nobody needs the cell at time_step or later
+        return self.last_reserved.get(position, -1) < time_step and position not in self.parked_from
+
+class RouteCache:
+    # LRU map from (map version, start, goal, algorithm) to search results for t=0
+    # searches. It follows its GridCity's change listener: each change moves the
+    # cache to the new map version and evicts only the entries the change can
+    # affect. A newly blocked cell invalidates the paths through it; a newly opened
+    # cell invalidates results a detour through it could beat (every step costs at
+    # least 1, so such a detour costs at least d(start, cell) + d(cell, goal)).
+    def __init__(self, environment, capacity=1024):
+        self.env = environment
+        self.capacity = capacity
+        self.version = environment.version
+        self.entries = OrderedDict()
+        self.keys_by_cell = {}
+        self.hits = 0
+        self.misses = 0
+        environment.add_change_listener(self._on_obstacle_change)
+
+    def detach(self):
+        self.env.remove_change_listener(self._on_obstacle_change)
+
+    def get(self, version, start_pos, goal_pos, algo):
+        key = (start_pos, goal_pos, algo)
+        if version != self.version or key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, version, start_pos, goal_pos, algo, result):
+        if version != self.version or self.capacity <= 0:
+            return
+        key = (start_pos, goal_pos, algo)
+        if key in self.entries:
+            self._evict(key)
+        self.entries[key] = dict(result)
+        for position in result['path'] or ():
+            self.keys_by_cell.setdefault(position, set()).add(key)
+        while len(self.entries) > self.capacity:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, key):
+        result = self.entries.pop(key)
+        for position in result['path'] or ():
+            keys = self.keys_by_cell.get(position)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_cell[position]
+
+    def _on_obstacle_change(self, position, time_step):
+        if time_step == 0:
+            if self.env.is_obstacle(position):
+                stale = list(self.keys_by_cell.get(position, ()))
+            else:
+                stale = [key for key, result in self.entries.items()
+                         if calculate_manhattan_heuristic(key[0], position) +
+                         calculate_manhattan_heuristic(position, key[1]) < result['cost']]
+            for key in stale:
+                self._evict(key)
+        self.version = self.env.version
+
 def calculate_manhattan_heuristic(start_pos, end_pos):
     x1, y1 = start_pos
     x2, y2 = end_pos
-    return abs(x1 - x2) + abs(y1 - y2)
\ No newline at end of file
+    return abs(x1 - x2) + abs(y1 - y2)
+
+def calculate_terrain_scaled_heuristic(start_pos, end_pos, min_step_cost, goal_cost):
+    # Every step but the last enters a cell costing at least min_step_cost and the
+    # last one enters the goal, so this stays admissible and consistent
+    distance = calculate_manhattan_heuristic(start_pos, end_pos)
+    if distance == 0:
+        return 0
+    return (distance - 1) * min_step_cost + goal_cost
\ No newline at end of file